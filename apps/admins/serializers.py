@@ -21,6 +21,7 @@ from apps.tasks.serializers import (
     TaskListSerializer,TaskUpdateSerializer
 )
 from apps.users.models import Profile
+from core import counters
 
 User = get_user_model()
 
@@ -191,7 +192,7 @@ class AdminProjectCreateSerializer(ProjectCreateSerializer):
 
         # Update total_member_count
         project.total_member_count = ProjectMembership.objects.filter(project=project).count()
-        project.save()
+        project.save(update_fields=['total_member_count'])
 
         return project
 
@@ -343,6 +344,7 @@ class AdminTaskUpdateSerializer(TaskUpdateSerializer):
                             TaskAssignment(task=instance, user_id=user_id)
                             for user_id in to_add
                         ])
+                        counters.assignments_changed(instance.id, to_add, 1)
                     instance.total_assignees = len(new_assignees)
 
             # Handle fields that are part of the parent serializer
@@ -10,10 +10,11 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.db.models import Count, F, Q, Sum, Prefetch
+from django.db.models import Count, Q, Sum, Prefetch
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse, OpenApiExample
+from kombu.exceptions import ChannelError
 from rest_framework import filters, permissions, status, viewsets, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -37,14 +38,19 @@ from apps.admins.serializers import (
     AdminUserDetailSerializer, AdminUserListSerializer,
     NotificationAdminSerializer, AdminTaskAssignmentSerializer,
 )
+from apps.notifications.middleware import invalidate_user_summaries
 from apps.notifications.models import Notification
+from apps.notifications.unread import reset_unread_counts, unread_changed
+from apps.notifications.utils import send_announcement, send_bulk_notifications
 from apps.projects.models import Project, ProjectMembership, ProjectInvitation
 from apps.projects.views import InvitationEmailMixin
 from apps.subscriptions.models import Payment, Subscription, SubscriptionPlan
 from apps.tasks.models import (Comment, StatusChangeRequest, Task,
                                 TaskAssignment)
+from core import counters
 from core.permissions import IsAdminUser
-from core.tasks import send_email, send_real_time_notification
+from core.side_effects import deferred_side_effects
+from core.services.mail_service import EmailService
 if settings.DEBUG:
     from project_planner.logging import DEBUG, ERROR, INFO, project_logger
 
@@ -206,6 +212,7 @@ class UserAdminViewSet(AdminViewSet):
         if user_ids == 'all':
             # Deactivate all users except the admin roles
             updated_count = User.objects.exclude(role='admin').update(is_active=False)
+            invalidate_user_summaries()
             self.log_admin_action('bulk_deactivate_all', None, {'user_ids': 'all'})
             return Response({'status': f'All {updated_count} users deactivated'})
 
@@ -213,6 +220,7 @@ class UserAdminViewSet(AdminViewSet):
             return Response({'error': 'No user IDs provided'}, status=status.HTTP_400_BAD_REQUEST)
         # Deactivate the specified users except the admin roles
         updated_count = User.objects.exclude(role='admin').filter(id__in=user_ids).update(is_active=False)
+        invalidate_user_summaries(user_ids)
         self.log_admin_action('bulk_deactivate', None, {'user_ids': user_ids})
         return Response({'status': f'{updated_count} users deactivated'})
 
@@ -238,11 +246,11 @@ class UserAdminViewSet(AdminViewSet):
         else:  # Send to specific users
             recipients = User.objects.filter(id__in=user_ids).values_list('email', flat=True)
 
-        if not recipients:
+        if not recipients.exists():
             return Response({'error': 'No recipients found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for recipient in recipients:
-            send_email.delay(subject, message, recipient)  # Async email sending via Celery
+        # Async email sending via Celery, one task and SMTP connection per batch of recipients
+        EmailService().send_bulk_email(subject, message, recipients.order_by('id').iterator(chunk_size=2000))
 
         self.log_admin_action('send_email', None, {'user_ids': user_ids, 'subject': subject})
         return Response({'status': 'emails sent'})
@@ -406,11 +414,9 @@ class ProjectAdminViewSet(AdminViewSet, InvitationEmailMixin):
 
     def send_invitation_emails(self, invitations):
         """
-        Sends invitation emails to each user in the list of invitations.
+        Sends invitation emails to each user in the list of invitations, in batches.
         """
-        for invitation in invitations:
-            # Using the mixin's method to send the email
-            self.send_invitation_email(self.request, invitation)
+        self.send_invitation_batch(self.request, invitations)
 @extend_schema_view(
     list=extend_schema(
         description="Retrieve a list of project memberships with filtering, searching, and ordering capabilities."
@@ -498,6 +504,7 @@ class ProjectMembershipAdminViewSet(viewsets.ViewSet):
             for user in users if user.id not in existing_user_ids
         ]
         ProjectMembership.objects.bulk_create(new_memberships)
+        counters.memberships_changed([membership.user_id for membership in new_memberships], 1)
         added_count = len(new_memberships)
 
         # Log the admin action
@@ -633,16 +640,24 @@ class TaskAdminViewSet(viewsets.ViewSet):
         serializer = AdminTaskBulkAssignSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        assignments = [
-            TaskAssignment(task_id=task_id, user_id=user_id)
-            for task_id in serializer.validated_data['task_ids']
-            for user_id in serializer.validated_data['user_ids']
-        ]
-
-        created = TaskAssignment.objects.bulk_create(assignments, ignore_conflicts=True)
-        Task.objects.filter(id__in=serializer.validated_data['task_ids']).update(
-            total_assignees=F('total_assignees') + len(serializer.validated_data['user_ids'])
-        )
+        task_ids = serializer.validated_data['task_ids']
+        user_ids = serializer.validated_data['user_ids']
+        with transaction.atomic():
+            existing = set(TaskAssignment.objects.filter(
+                task_id__in=task_ids, user_id__in=user_ids
+            ).values_list('task_id', 'user_id'))
+            new_users = {
+                task_id: [user_id for user_id in user_ids if (task_id, user_id) not in existing]
+                for task_id in task_ids
+            }
+            created = TaskAssignment.objects.bulk_create([
+                TaskAssignment(task_id=task_id, user_id=user_id)
+                for task_id, users in new_users.items()
+                for user_id in users
+            ], ignore_conflicts=True)
+            # bulk_create sends no signals, so the counters of the new rows are applied here
+            for task_id, users in new_users.items():
+                counters.assignments_changed(task_id, users, 1)
 
         self.log_admin_action('bulk_assign', None, {
             'task_ids': serializer.validated_data['task_ids'],
@@ -666,12 +681,7 @@ class TaskAdminViewSet(viewsets.ViewSet):
             user_id__in=serializer.validated_data['user_ids']
         )
 
-        task_counts = assignments_to_delete.values('task_id').annotate(count=Count('id'))
-        for task_count in task_counts:
-            Task.objects.filter(id=task_count['task_id']).update(
-                total_assignees=F('total_assignees') - task_count['count']
-            )
-
+        # Counters are decremented by the TaskAssignment post_delete signal
         deleted_count = assignments_to_delete.delete()[0]
         self.log_admin_action('bulk_unassign', None, {
             'task_ids': serializer.validated_data['task_ids'],
@@ -790,12 +800,14 @@ class AdminStatusChangeRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
+        # Counter updates and notifications triggered by the task saves are
+        # collected and applied once when the transaction commits
+        with transaction.atomic(), deferred_side_effects():
             # Fetch the status change requests that are pending
             requests = self.get_queryset().filter(
                 id__in=request_ids,
                 status='pending'
-            )
+            ).select_related('task')
             
             for request_obj in requests:
                 if action == 'approve':
@@ -1075,6 +1087,27 @@ class NotificationAdminViewSet(viewsets.ModelViewSet):
             'recipient', 'sender', 'content_type'
         ).prefetch_related('content_object')
 
+    def perform_create(self, serializer):
+        notification = serializer.save()
+        if not notification.is_read:
+            unread_changed({notification.recipient_id: 1})
+
+    def perform_update(self, serializer):
+        """
+        Save the notification and move its unread count with its read status and recipient.
+        """
+        old_recipient_id, was_read = serializer.instance.recipient_id, serializer.instance.is_read
+        notification = serializer.save()
+        deltas = {old_recipient_id: 0 if was_read else -1}
+        deltas[notification.recipient_id] = deltas.get(notification.recipient_id, 0) + (0 if notification.is_read else 1)
+        unread_changed(deltas)
+
+    def perform_destroy(self, instance):
+        recipient_id, was_read = instance.recipient_id, instance.is_read
+        instance.delete()
+        if not was_read:
+            unread_changed({recipient_id: -1})
+
     @action(detail=False, methods=['post'])
     def send(self, request):
         """
@@ -1088,26 +1121,26 @@ class NotificationAdminViewSet(viewsets.ModelViewSet):
         if not title or not body:
             return Response({'error': 'Title, body, and URL are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if user_ids == 'all':  # Notify all users
-            users = User.objects.all()
-        else:  # Notify specific users
-            users = User.objects.filter(id__in=user_ids)
+        if user_ids == 'all':  # Notify all users with one announcement instead of a row per user
+            send_announcement({"title": title, "body": body, "url": url}, sender=request.user)
+            self.log_admin_action('send_notification', None, {'user_ids': user_ids, 'title': title})
+            return Response({'status': 'notifications sent'})
 
+        users = User.objects.filter(id__in=user_ids)  # Notify specific users
         if not users.exists():
             return Response({'error': 'No recipients found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for user in users:
-            send_real_time_notification.delay(
-                user=user,
-                message={
-                    "title": title,
-                    "body": body,
-                    "url": url,
-                },
-                notification_type="admin_notification",
-                content_type=ContentType.objects.get_for_model(User).id,
-                object_id=user.id
-            )
+        send_bulk_notifications(
+            users.values_list('id', flat=True).iterator(chunk_size=2000),
+            message={
+                "title": title,
+                "body": body,
+                "url": url,
+            },
+            notification_type="admin_notification",
+            content_type=ContentType.objects.get_for_model(User).id,
+            sender=request.user
+        )
 
         self.log_admin_action('send_notification', None, {'user_ids': user_ids, 'title': title})
         return Response({'status': 'notifications sent'})
@@ -1122,7 +1155,11 @@ class NotificationAdminViewSet(viewsets.ModelViewSet):
         if not notification_ids:
             return Response({'error': 'No notifications specified'}, status=400)
             
-        deleted_count = Notification.objects.filter(id__in=notification_ids).delete()[0]
+        notifications = Notification.objects.filter(id__in=notification_ids)
+        unread_recipients = set(notifications.filter(is_read=False).values_list('recipient_id', flat=True))
+        deleted_count = notifications.delete()[0]
+        # Recipients who lost unread notifications get their counters recounted on the next read
+        reset_unread_counts(unread_recipients)
         
         self.log_admin_action('bulk_delete_notifications', None, {
             'notification_ids': notification_ids,
@@ -1471,9 +1508,24 @@ class SystemHealthView(viewsets.ViewSet):
                 + sum(len(v) for v in active.values())
                 + sum(len(v) for v in scheduled.values())
             )
-            return {"worker_queue": {"status": "healthy" if total < 100 else "backlogged", "total_tasks": total}}
+            # Messages waiting in each broker queue, not yet taken by a worker
+            queues = {}
+            with app.connection_for_read() as connection:
+                for queue in settings.CELERY_TASK_QUEUES:
+                    # A queue nothing was sent to yet does not exist on the broker, so it is empty
+                    with connection.channel() as channel:
+                        try:
+                            queues[queue.name] = channel.queue_declare(queue.name, passive=True).message_count
+                        except ChannelError:
+                            queues[queue.name] = 0
+            backlogged = total >= 100 or any(depth >= 100 for depth in queues.values())
+            return {"worker_queue": {
+                "status": "backlogged" if backlogged else "healthy",
+                "total_tasks": total,
+                "queues": queues,
+            }}
         except Exception:
-            return {"worker_queue": {"status": "error", "total_tasks": 0}}
+            return {"worker_queue": {"status": "error", "total_tasks": 0, "queues": {}}}
 
 @extend_schema_view(
     list=extend_schema(
@@ -1,6 +1,14 @@
 from django.contrib import admin
-from apps.notifications.models import Notification, NotificationPreference
+from apps.notifications.models import (
+    Announcement, AnnouncementReceipt, ArchivedNotification, Notification, NotificationOutbox, NotificationPreference,
+    ReminderMarker
+)
 # Register your models here.
 
 admin.site.register(Notification)
+admin.site.register(NotificationOutbox)
 admin.site.register(NotificationPreference)
+admin.site.register(ArchivedNotification)
+admin.site.register(Announcement)
+admin.site.register(AnnouncementReceipt)
+admin.site.register(ReminderMarker)
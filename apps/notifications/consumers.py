@@ -1,6 +1,11 @@
 import json
-import asyncio
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from apps.notifications.heartbeat import heartbeat
+from apps.notifications.replay import read_database, read_stream
+from apps.notifications.utils import ANNOUNCEMENTS_GROUP
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -11,34 +16,54 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
+            await self.channel_layer.group_add(ANNOUNCEMENTS_GROUP, self.channel_name)
             await self.accept()
 
-            # Start pinging after every 30 seconds to keep the connection alive
-            self.ping_task = asyncio.create_task(self.ping())
+            # Keep the connection alive with the process-wide heartbeat
+            heartbeat.register(self)
+            await self.replay_missed()
 
         else:
             await self.close(code=4001)  # Unauthorized connection
 
     async def disconnect(self, close_code):
+        heartbeat.unregister(self)
         if self.user.is_authenticated:
             await self.channel_layer.group_discard(
                 self.group_name,
                 self.channel_name
             )
-        
-        # Cancel the ping task when the connection closes
-        if hasattr(self, 'ping_task'):
-            self.ping_task.cancel()
+            await self.channel_layer.group_discard(ANNOUNCEMENTS_GROUP, self.channel_name)
+
+    async def replay_missed(self):
+        """
+        Send the notifications newer than the client's ?since_id before live ones.
+        The group is already joined, so nothing is lost in between; clients
+        drop frames whose id they have seen.
+        """
+        since_id = parse_qs(self.scope["query_string"].decode()).get("since_id", [None])[0]
+        if not since_id or not since_id.isdigit():
+            return
+        since_id = int(since_id)
+
+        frames = await sync_to_async(read_stream, thread_sensitive=False)(self.user.id, since_id)
+        if frames is None:
+            frames = await database_sync_to_async(read_database)(self.user.id, since_id)
+        for frame in frames:
+            await self.send(text_data=frame)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Any frame from the client (e.g. a pong) marks the connection as active
+        heartbeat.touch(self)
 
     async def send_notification(self, event):
         await self.send(text_data=json.dumps(event["data"]))
 
-    async def ping(self):
-        while True:
-            try:
-                # Send ping message to keep the connection alive
-                await self.send(text_data=json.dumps({"ping": "ping"}))
-                await asyncio.sleep(30)  # Wait for 30 seconds before sending the next ping
-            except Exception as e:
-                # Handle any exceptions, if WebSocket connection is closed
-                break
+    async def send_unread_count(self, event):
+        await self.send(text_data=json.dumps(event["data"]))
+
+    async def send_digest(self, event):
+        await self.send(text_data=json.dumps(event["data"]))
+
+    async def send_announcement(self, event):
+        await self.send(text_data=json.dumps(event["data"]))
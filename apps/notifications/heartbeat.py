@@ -0,0 +1,85 @@
+"""
+Process-wide heartbeat for WebSocket consumers.
+
+Instead of one sleeping ping task per socket, every consumer registers with a
+single HeartbeatService per process. One loop wakes every ping interval and
+sends the same pre-encoded ping frame to the registered consumers in batches,
+closing connections that failed the send or stayed idle for too long.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from project_planner.logging import ERROR, project_logger
+
+PING_FRAME = json.dumps({"ping": "ping"})
+HEARTBEAT_BATCH_SIZE = 500  # sends awaited together before yielding to the event loop
+IDLE_CLOSE_CODE = 4002
+
+
+class HeartbeatService:
+    """
+    Registry of live consumers and the single task that pings them.
+    """
+    def __init__(self, interval=None, idle_timeout=None, batch_size=HEARTBEAT_BATCH_SIZE):
+        self.interval = interval if interval is not None else settings.NOTIFICATION_WS_PING_INTERVAL
+        self.idle_timeout = idle_timeout if idle_timeout is not None else settings.NOTIFICATION_WS_IDLE_TIMEOUT
+        self.batch_size = batch_size
+        self.consumers = {}  # consumer -> monotonic time of its last frame from the client
+        self._task = None
+
+    def register(self, consumer):
+        self.consumers[consumer] = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def unregister(self, consumer):
+        self.consumers.pop(consumer, None)
+
+    def touch(self, consumer):
+        """Record activity from the client side of a connection."""
+        if consumer in self.consumers:
+            self.consumers[consumer] = time.monotonic()
+
+    async def run(self):
+        # Exits once no consumer is left and is restarted by the next register()
+        while self.consumers:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                project_logger.log(ERROR, f"Heartbeat tick failed: {str(e)}")
+
+    async def tick(self):
+        """
+        Ping every registered consumer once and close the idle and dead ones.
+        """
+        current_time = time.monotonic()
+        consumers = list(self.consumers.items())
+        for start in range(0, len(consumers), self.batch_size):
+            live, idle = [], []
+            for consumer, last_seen in consumers[start:start + self.batch_size]:
+                if self.idle_timeout and current_time - last_seen > self.idle_timeout:
+                    idle.append(consumer)
+                else:
+                    live.append(consumer)
+
+            results = await asyncio.gather(
+                *(consumer.send(text_data=PING_FRAME) for consumer in live),
+                return_exceptions=True
+            )
+            dead = [consumer for consumer, result in zip(live, results) if isinstance(result, Exception)]
+
+            for consumer in idle + dead:
+                self.unregister(consumer)
+            await asyncio.gather(
+                *(consumer.close(code=IDLE_CLOSE_CODE) for consumer in idle),
+                *(consumer.close() for consumer in dead),
+                return_exceptions=True
+            )
+            # Let queued messages through between batches
+            await asyncio.sleep(0)
+
+
+heartbeat = HeartbeatService()
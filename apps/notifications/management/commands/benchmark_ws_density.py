@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.heartbeat import HeartbeatService
+
+
+class FakeConsumer:
+    """Stands in for a connected NotificationConsumer; sends are counted, not written."""
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.sent += 1
+
+    async def close(self, code=None):
+        pass
+
+
+async def legacy_ping(consumer, interval):
+    # The former per-socket keepalive loop of NotificationConsumer
+    while True:
+        try:
+            await consumer.send(text_data=json.dumps({"ping": "ping"}))
+            await asyncio.sleep(interval)
+        except Exception:
+            break
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the memory per socket and the cost of one ping cycle between one ping "
+        "task per WebSocket and the shared heartbeat service, using simulated connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=50000, help="Number of simulated sockets.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        connections = options['connections']
+        results = {
+            'connections': connections,
+            'per_socket_tasks': asyncio.run(self.measure_legacy(connections)),
+            'shared_heartbeat': asyncio.run(self.measure_heartbeat(connections)),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Simulated connections: {connections}")
+        for name in ('per_socket_tasks', 'shared_heartbeat'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:>18}: {result['bytes_per_socket']:.0f} bytes/socket, "
+                f"{result['ping_cycle_ms']:.1f} ms per ping cycle"
+            )
+
+    async def measure_legacy(self, connections):
+        consumers = [FakeConsumer() for _ in range(connections)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        # A long interval parks every task after its first ping, as in production
+        tasks = [asyncio.create_task(legacy_ping(consumer, 3600)) for consumer in consumers]
+        started = time.perf_counter()
+        await asyncio.sleep(0)  # Every task runs once: one ping cycle
+        await asyncio.sleep(0)
+        elapsed = time.perf_counter() - started
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return {'bytes_per_socket': used / connections, 'ping_cycle_ms': elapsed * 1000}
+
+    async def measure_heartbeat(self, connections):
+        consumers = [FakeConsumer() for _ in range(connections)]
+        service = HeartbeatService(interval=3600, idle_timeout=0)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for consumer in consumers:
+            service.register(consumer)
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        await service.tick()
+        elapsed = time.perf_counter() - started
+
+        service.consumers.clear()
+        service._task.cancel()
+        await asyncio.gather(service._task, return_exceptions=True)
+        return {'bytes_per_socket': used / connections, 'ping_cycle_ms': elapsed * 1000}
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.notifications.models import Notification
+from apps.notifications.unread import reset_unread_counts
+from apps.notifications.utils import _group_send_all, send_bulk_notifications
+from project_planner.celery import app as celery_app
+
+User = get_user_model()
+
+IN_MEMORY_LAYER = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        'CONFIG': {'capacity': 1000},
+    },
+}
+SEND_TICK = 0.01  # seconds between send batches
+BENCHMARK_TITLE = "Benchmark"
+
+
+def redis_available():
+    """Check whether the Redis server of the configured channel layer answers a ping."""
+    import redis
+
+    try:
+        host = settings.CHANNEL_LAYERS['default']['CONFIG']['hosts'][0]
+        if isinstance(host, str):
+            client = redis.Redis.from_url(host, socket_connect_timeout=1)
+        else:
+            client = redis.Redis(host=host[0], port=host[1], socket_connect_timeout=1)
+        return client.ping()
+    except Exception:
+        return False
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test of the WebSocket fan-out: boots the ASGI application, opens simulated "
+        "authenticated NotificationConsumer sockets and sends notifications at a fixed rate. "
+        "By default they go through send_bulk_notifications, the outbox and dispatch_outbox "
+        "like in production; --path channel pushes straight to the channel layer instead. "
+        "Reports delivery latency percentiles, memory per connection and CPU time per message as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help="Number of simulated sockets.")
+        parser.add_argument('--users', type=int, default=100, help="Active users the sockets authenticate as.")
+        parser.add_argument('--rate', type=int, default=1000, help="Notifications sent per second.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds to keep sending.")
+        parser.add_argument(
+            '--layer', choices=['auto', 'memory', 'redis'], default='auto',
+            help="Channel layer to use. 'auto' uses the configured Redis layer when it is reachable."
+        )
+        parser.add_argument(
+            '--path', choices=['outbox', 'channel'], default='outbox',
+            help="'outbox' stores every notification and pushes it with the outbox dispatcher, "
+                 "'channel' only measures the channel layer group_send."
+        )
+        parser.add_argument('--output', help="File to write the JSON results to.")
+
+    def handle(self, *args, **options):
+        layer = options['layer']
+        if layer == 'auto':
+            layer = 'redis' if redis_available() else 'memory'
+        elif layer == 'redis' and not redis_available():
+            raise CommandError("The Redis server of the channel layer is not reachable.")
+
+        users = list(User.objects.filter(is_active=True).values_list('id', flat=True)[:options['users']])
+        if not users:
+            raise CommandError("At least one active user is needed to authenticate the sockets.")
+        tokens = {user_id: str(AccessToken.for_user(User(id=user_id))) for user_id in users}
+
+        channel_layers = settings.CHANNEL_LAYERS if layer == 'redis' else IN_MEMORY_LAYER
+        last_id = Notification.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        # The dispatch queued after each commit runs inline, as a worker picking it up would
+        always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        try:
+            with override_settings(CHANNEL_LAYERS=channel_layers):
+                results = asyncio.run(self.run_benchmark(tokens, options))
+        finally:
+            celery_app.conf.task_always_eager = always_eager
+            if options['path'] == 'outbox':
+                Notification.objects.filter(id__gt=last_id, title=BENCHMARK_TITLE).delete()
+                reset_unread_counts(users)
+        results = {'layer': layer, 'path': options['path'], 'users': len(users), **results}
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    async def run_benchmark(self, tokens, options):
+        from project_planner.asgi import application
+
+        user_ids = list(tokens)
+        sockets = []  # (user_id, communicator)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        for index in range(options['connections']):
+            user_id = user_ids[index % len(user_ids)]
+            communicator = WebsocketCommunicator(application, f"/ws/notifications/?token={tokens[user_id]}")
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise CommandError(f"Socket {index} was rejected by the consumer.")
+            sockets.append((user_id, communicator))
+        connect_seconds = time.perf_counter() - started
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        latencies = []
+        receivers = [asyncio.create_task(self.receive(communicator, latencies)) for _, communicator in sockets]
+        sent = await self.send(get_channel_layer(), user_ids, options)
+
+        # Give the last messages time to arrive before counting
+        await asyncio.sleep(1)
+        for receiver in receivers:
+            receiver.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        await asyncio.gather(*(communicator.disconnect() for _, communicator in sockets), return_exceptions=True)
+
+        latencies.sort()
+        return {
+            'connections': len(sockets),
+            'connect_seconds': round(connect_seconds, 3),
+            'bytes_per_connection': round(used / len(sockets)),
+            'notifications_sent': sent['notifications'],
+            'deliveries_expected': sum(
+                sent['recipients'][f'user_{user_id}'] for user_id, _ in sockets
+            ),
+            'deliveries': len(latencies),
+            'achieved_rate': round(sent['notifications'] / sent['seconds'], 1),
+            'cpu_us_per_delivery': round(sent['cpu_seconds'] / len(latencies) * 1e6, 1) if latencies else None,
+            'latency_ms': {
+                name: round(value * 1000, 3) if value is not None else None
+                for name, value in (
+                    ('p50', percentile(latencies, 0.50)),
+                    ('p90', percentile(latencies, 0.90)),
+                    ('p99', percentile(latencies, 0.99)),
+                    ('max', latencies[-1] if latencies else None),
+                )
+            },
+        }
+
+    async def send(self, channel_layer, user_ids, options):
+        """
+        Send notifications to random users in ticks of SEND_TICK seconds.
+        Each frame carries its send time so receivers can measure the latency.
+        """
+        per_tick = max(int(options['rate'] * SEND_TICK), 1)
+        store = sync_to_async(self.store_and_dispatch, thread_sensitive=True)
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        sent = 0
+        recipients = Counter()  # group -> notifications sent to it
+        while time.perf_counter() - started < options['duration']:
+            tick_started = time.perf_counter()
+            targets = [random.choice(user_ids) for _ in range(per_tick)]
+            if options['path'] == 'outbox':
+                await store(targets)
+            else:
+                await _group_send_all(channel_layer, [
+                    (f'user_{user_id}', {
+                        'type': 'send_notification',
+                        'data': {'id': sent + offset, 'title': BENCHMARK_TITLE, 'body': "", 'url': None,
+                                 'sent_at': time.perf_counter()},
+                    })
+                    for offset, user_id in enumerate(targets)
+                ])
+            recipients.update(f'user_{user_id}' for user_id in targets)
+            sent += per_tick
+            await asyncio.sleep(max(SEND_TICK - (time.perf_counter() - tick_started), 0))
+        elapsed = time.perf_counter() - started
+
+        # Receivers run on the same loop, so CPU time covers both ends of the delivery
+        await asyncio.sleep(0)
+        return {
+            'notifications': sent,
+            'recipients': recipients,
+            'seconds': elapsed,
+            'cpu_seconds': time.process_time() - cpu_started,
+        }
+
+    def store_and_dispatch(self, user_ids):
+        """
+        Store one notification per user id through send_bulk_notifications. Each commit
+        queues the outbox dispatch, which runs dispatch_outbox inline. The send time
+        travels in the body, the only free-form field of the pushed payload.
+        """
+        for user_id in user_ids:
+            send_bulk_notifications(
+                [user_id],
+                message={"title": BENCHMARK_TITLE, "body": repr(time.perf_counter()), "url": None},
+                notification_type="admin_notification",
+            )
+
+    async def receive(self, communicator, latencies):
+        while True:
+            frame = json.loads(await communicator.receive_from(timeout=3600))
+            if 'sent_at' in frame:
+                latencies.append(time.perf_counter() - frame['sent_at'])
+            elif frame.get('title') == BENCHMARK_TITLE:
+                latencies.append(time.perf_counter() - float(frame['body']))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.notifications.utils import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Long-running dispatcher that drains the notification outbox in batches and "
+        "pushes the notifications to the channel layer. Alternative to the periodic "
+        "dispatch_notification_outbox Celery task."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+            help="Number of outbox entries pushed per batch."
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help="Seconds to sleep when the outbox is empty."
+        )
+        parser.add_argument('--once', action='store_true', help="Drain the outbox once and exit.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_delivered = total_failed = 0
+        while True:
+            close_old_connections()
+            delivered, failed = dispatch_outbox(batch_size)
+            total_delivered += delivered
+            total_failed += failed
+            if delivered + failed:
+                self.stdout.write(f"Dispatched {delivered} notification(s), {failed} failed")
+            if delivered + failed < batch_size:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {total_delivered} delivered, {total_failed} failed."
+        ))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.notifications.models import NotificationPreference, NOTIFICATION_TYPES
+from apps.notifications.preferences import invalidate_preferences
 
 User = get_user_model()
 
@@ -27,4 +28,6 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.SUCCESS(f"Updated preferences for {user.username}"))
 
+        # Drop the cached preference bitmasks so the fan-out path sees the new values
+        invalidate_preferences(users.values_list('id', flat=True))
         self.stdout.write(self.style.SUCCESS("All users' notification preferences have been populated."))
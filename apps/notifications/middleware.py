@@ -1,25 +1,68 @@
 import jwt
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
 from channels.auth import AuthMiddlewareStack
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.conf import settings
+from django.core.cache import cache
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Fields of the user summary cached for WebSocket handshakes
+USER_SUMMARY_FIELDS = ['id', 'username', 'email', 'role', 'is_staff', 'is_active']
+USER_SUMMARY_TIMEOUT = 60 * 60  # 1 hour
+
+
+def user_summary_cache_key(user_id):
+    return f'ws_user_summary_{user_id}'
+
+
+def invalidate_user_summaries(user_ids=None):
+    """
+    Drop the cached summaries of the given users, or of every user when None.
+    Called on user save, delete and bulk deactivation.
+    """
+    if user_ids is None:
+        cache.delete_pattern(user_summary_cache_key('*'))
+    else:
+        cache.delete_many([user_summary_cache_key(user_id) for user_id in user_ids])
+
+
 @database_sync_to_async
-def get_user_from_token(token):
+def load_user_summary(user_id):
+    """
+    Load and cache the summary of an active user. Inactive and missing users are not cached.
+    """
+    summary = User.objects.filter(id=user_id, is_active=True).values(*USER_SUMMARY_FIELDS).first()
+    if summary is not None:
+        cache.set(user_summary_cache_key(user_id), summary, timeout=USER_SUMMARY_TIMEOUT)
+    return summary
+
+
+async def get_user_from_token(token):
     """
     Retrieves the user associated with the provided JWT token.
+    The user is built from a cached summary, so a handshake only touches the
+    database when the summary is not cached yet. Consumers get an unsaved User
+    instance carrying the USER_SUMMARY_FIELDS.
     """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user = User.objects.get(id=payload["user_id"])
-        return user
-    except (jwt.ExpiredSignatureError, jwt.DecodeError, User.DoesNotExist):
+        user_id = payload["user_id"]
+    except (jwt.ExpiredSignatureError, jwt.DecodeError, KeyError):
         return AnonymousUser()
 
+    # Not thread sensitive, so cache reads do not queue behind database work
+    summary = await sync_to_async(cache.get, thread_sensitive=False)(user_summary_cache_key(user_id))
+    if summary is None:
+        summary = await load_user_summary(user_id)
+    if summary is None:
+        return AnonymousUser()
+    return User(**summary)
+
 class JWTAuthMiddleware:
     """
     Custom middleware for authenticating WebSocket connections using JWT.
@@ -37,9 +80,9 @@ class JWTAuthMiddleware:
             auth_header = headers[b"authorization"].decode("utf-8")
             if auth_header.startswith("Bearer "):
                 token = auth_header.split("Bearer ")[1]
-        elif "token" in scope["query_string"].decode():
-            query_params = dict(qc.split('=') for qc in scope["query_string"].decode().split("&"))
-            token = query_params.get("token")
+        else:
+            # parse_qs splits on the first '=' only, so base64 padding in the token is kept
+            token = parse_qs(scope["query_string"].decode()).get("token", [None])[0]
 
         if token:
             scope["user"] = await get_user_from_token(token)
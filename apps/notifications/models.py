@@ -1,4 +1,3 @@
-import datetime
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
@@ -9,15 +8,22 @@ User = get_user_model()
 
 # Retry limit and delay (in seconds) constants
 RETRY_LIMIT = 3
-RETRY_DELAY = 60  # 1 minute
+RETRY_DELAY = 60  # 1 minute, doubled after every failed attempt
+RETRY_BACKOFF_MAX = 60 * 60  # 1 hour
 
 # Constants for Notification
 STATUS_CHOICES = [
     ('pending', 'Pending'),
     ('delivered', 'Delivered'),
     ('failed', 'Failed'),
+    ('dead', 'Dead-lettered'),  # Gave up after RETRY_LIMIT attempts
 ]
 
+
+def retry_backoff(retry_count):
+    """Seconds to wait after the last attempt before retrying a notification that failed retry_count times."""
+    return min(RETRY_DELAY * 2 ** max(retry_count - 1, 0), RETRY_BACKOFF_MAX)
+
 PRIORITY_CHOICES = [
     ('low', 'Low'),
     ('medium', 'Medium'),
@@ -44,7 +50,13 @@ class Notification(models.Model):
     sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="sent_notifications",
         help_text="User who triggered the notification"
     )
+    title = models.CharField(max_length=255, blank=True, default='',
+        help_text="Title of the pushed notification"
+    )
     message = models.TextField(help_text="Content of the notification")
+    url = models.CharField(max_length=500, blank=True, default='',
+        help_text="Link of the pushed notification"
+    )
     # Status tracking
     is_read = models.BooleanField(default=False, db_index=True,
         help_text="Indicates if the notification has been read"
@@ -72,6 +84,23 @@ class Notification(models.Model):
     )
     retry_count = models.PositiveIntegerField(default=0)
     last_attempt_at = models.DateTimeField(null=True, blank=True)
+    # Coalescing of repeated events on the same object
+    occurrence_count = models.PositiveIntegerField(default=1,
+        help_text="Number of events coalesced into this notification"
+    )
+    updated_at = models.DateTimeField(auto_now=True,
+        help_text="Timestamp of the latest coalesced event"
+    )
+
+    class Meta:
+        indexes = [
+            # Cursor pagination keyset of a user's notifications
+            models.Index(fields=['recipient', '-created_at', '-id']),
+            # Coalescing lookup of an unread notification about the same object
+            models.Index(fields=['recipient', 'content_type', 'object_id', 'notification_type']),
+            # Retry sweep over failed and pending deliveries
+            models.Index(fields=['status', 'last_attempt_at']),
+        ]
     
     def mark_as_read(self):
         """Marks the notification as read and saves it"""
@@ -80,38 +109,29 @@ class Notification(models.Model):
 
     def resend_notification(self):
         """
-        Retry sending a failed notification.
+        Queue the notification for another delivery attempt by the outbox dispatcher.
         """
-        from notifications.utils import send_real_time_notification
-
         if self.retry_count >= RETRY_LIMIT:
-            self.status = 'failed'
-            self.save()
-            return False
-
-        if self.last_attempt_at and (
-            datetime.datetime.now(datetime.timezone.utc) - self.last_attempt_at
-        ).total_seconds() < RETRY_DELAY:
-            # Don't retry if the delay between attempts hasn't passed
+            self.status = 'dead'
+            self.save(update_fields=['status'])
             return False
 
-        try:
-            send_real_time_notification(
-                user=self.recipient,
-                message={"title": "Retry Notification", "body": self.message},
-                notification_type=self.notification_type,
-                content_type=self.content_type_id,
-                object_id=self.object_id,
-            )
-            self.status = 'delivered'
-            self.retry_count = 0  # Reset retry count on success
-        except Exception:
-            self.retry_count += 1
-            self.status = 'failed' if self.retry_count >= RETRY_LIMIT else 'pending'
-        finally:
-            self.last_attempt_at = datetime.datetime.now(datetime.timezone.utc)
-            self.save()
+        NotificationOutbox.objects.get_or_create(notification=self, defaults={'payload': self.get_payload()})
+        self.status = 'pending'
+        self.save(update_fields=['status'])
+        return True
     
+    def get_payload(self):
+        """
+        Rebuild the pushed payload when the outbox entry is gone, e.g. for retries and replay.
+        Rows saved without a title fall back to the label of their type.
+        """
+        return {
+            'title': self.title or dict(NOTIFICATION_TYPES).get(self.notification_type, "Notification"),
+            'body': self.message,
+            'url': self.url or None,
+        }
+
     def get_content_object_url(self):
         """
         Get the URL for the content object associated with this notification.
@@ -126,6 +146,119 @@ class Notification(models.Model):
         """String representation of the notification"""
         return f"Notification for {self.recipient.username}: {self.message}"
 
+class NotificationOutbox(models.Model):
+    """
+    Transactional outbox of WebSocket pushes.
+    Rows are written in the same transaction as their notification and drained in
+    batches by the dispatcher, so request latency never includes a channel layer
+    round trip and rolled back notifications are never pushed.
+    """
+    notification = models.OneToOneField(Notification, on_delete=models.CASCADE, related_name="outbox_entry",
+        help_text="Notification to push to its recipient"
+    )
+    payload = models.JSONField(
+        help_text="Data sent to the recipient's WebSocket group (title, body, url)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True,
+        help_text="Timestamp when the push was queued"
+    )
+    # Set by the dispatcher that is pushing the entry, so concurrent dispatchers skip it
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+
+    def __str__(self):
+        return f"Outbox entry for notification {self.notification_id}"
+
+class ArchivedNotification(models.Model):
+    """
+    Read notifications moved out of the hot Notification table by
+    core.tasks.archive_notifications once they are older than NOTIFICATION_ARCHIVE_AFTER_DAYS.
+    Rows keep their original primary key.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_notifications")
+    sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    title = models.CharField(max_length=255, blank=True, default='')
+    message = models.TextField()
+    url = models.CharField(max_length=500, blank=True, default='')
+    is_read = models.BooleanField(default=True)
+    created_at = models.DateTimeField(db_index=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    content_object = GenericForeignKey('content_type', 'object_id')
+    notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='delivered')
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='medium')
+    occurrence_count = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # Fields copied from Notification when a row is archived
+    COPIED_FIELDS = [
+        'id', 'recipient_id', 'sender_id', 'title', 'message', 'url', 'is_read', 'created_at', 'content_type_id',
+        'object_id', 'notification_type', 'status', 'priority', 'occurrence_count',
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id']),
+        ]
+
+    def __str__(self):
+        return f"Archived notification {self.id} for user {self.recipient_id}"
+
+class ReminderMarker(models.Model):
+    """
+    Records that a reminder of a kind was sent to a recipient about an object,
+    so periodic reminder jobs send it once per due date instead of on every run.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reminder_markers")
+    kind = models.CharField(max_length=50, help_text="Kind of reminder, e.g. due_soon")
+    due_date = models.DateTimeField(help_text="Due date the reminder was sent for, a new due date re-arms it")
+    sent_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("content_type", "object_id", "recipient", "kind")
+
+    def __str__(self):
+        return f"{self.kind} reminder for {self.content_type_id}:{self.object_id} to user {self.recipient_id}"
+
+class Announcement(models.Model):
+    """
+    Broadcast notification stored once for all users.
+    Delivered through the shared announcements channel group and listed by
+    AnnouncementListView until it expires. Read state is kept in AnnouncementReceipt
+    rows, created lazily when a user marks the announcement as read.
+    """
+    sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="announcements",
+        help_text="Admin who sent the announcement"
+    )
+    title = models.CharField(max_length=255)
+    message = models.TextField(help_text="Content of the announcement")
+    url = models.CharField(max_length=500, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(null=True, blank=True,
+        help_text="After this time the announcement is no longer listed"
+    )
+
+    def __str__(self):
+        return f"Announcement: {self.title}"
+
+class AnnouncementReceipt(models.Model):
+    """
+    Marks an announcement as read by a user.
+    """
+    announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name="receipts")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="announcement_receipts")
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("announcement", "user")
+
+    def __str__(self):
+        return f"{self.user_id} read announcement {self.announcement_id}"
+
 class NotificationPreference(models.Model):
     """
     Model for storing user preferences for different types of notifications.
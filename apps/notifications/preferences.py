@@ -0,0 +1,70 @@
+"""
+Cached notification preferences used at fan-out time.
+
+Each user's preferences are stored in the cache as a bitmask with one bit per
+entry of NOTIFICATION_TYPES, so filtering a batch of recipients costs one
+cache.get_many and, on a miss, one query for all missing users.
+"""
+from django.core.cache import cache
+from apps.notifications.models import NOTIFICATION_TYPES, NotificationPreference
+
+PREFERENCE_BITS = {notification_type: 1 << index for index, (notification_type, _) in enumerate(NOTIFICATION_TYPES)}
+ALL_ENABLED = sum(PREFERENCE_BITS.values())
+PREFERENCE_CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+
+# Notification types sent under the preference of a broader category
+PREFERENCE_ALIASES = {
+    'comment_mention': 'comment',
+    'comment_reply': 'comment',
+    'task_comment': 'comment',
+}
+
+
+def _cache_key(user_id):
+    return f'notification_preferences_{user_id}'
+
+
+def to_bitmask(preferences):
+    """Convert a preferences dict to a bitmask. Missing types are enabled."""
+    return sum(bit for notification_type, bit in PREFERENCE_BITS.items() if preferences.get(notification_type, True))
+
+
+def cache_preferences(user_id, preferences):
+    """Write the bitmask of a user's updated preferences to the cache."""
+    cache.set(_cache_key(user_id), to_bitmask(preferences), timeout=PREFERENCE_CACHE_TIMEOUT)
+
+
+def invalidate_preferences(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def get_preference_masks(user_ids):
+    """
+    Return a {user_id: bitmask} dict for the given users.
+    Cache misses are loaded with a single query and written back.
+    """
+    keys = {_cache_key(user_id): user_id for user_id in user_ids}
+    masks = {keys[key]: mask for key, mask in cache.get_many(list(keys)).items()}
+
+    missing = [user_id for user_id in user_ids if user_id not in masks]
+    if missing:
+        loaded = {user_id: ALL_ENABLED for user_id in missing}
+        for user_id, preferences in NotificationPreference.objects.filter(
+            user_id__in=missing
+        ).values_list('user_id', 'preferences'):
+            loaded[user_id] = to_bitmask(preferences or {})
+        cache.set_many({_cache_key(user_id): mask for user_id, mask in loaded.items()}, timeout=PREFERENCE_CACHE_TIMEOUT)
+        masks.update(loaded)
+    return masks
+
+
+def filter_recipients(user_ids, notification_type):
+    """
+    Drop the users who disabled the given notification type.
+    Types without a preference (e.g. admin notifications) are always delivered.
+    """
+    bit = PREFERENCE_BITS.get(PREFERENCE_ALIASES.get(notification_type, notification_type))
+    if bit is None or not user_ids:
+        return list(user_ids)
+    masks = get_preference_masks(user_ids)
+    return [user_id for user_id in user_ids if masks[user_id] & bit]
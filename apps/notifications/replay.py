@@ -0,0 +1,69 @@
+"""
+Replay of missed notifications for reconnecting WebSocket clients.
+
+Every pushed notification is also appended to a short, capped Redis stream per
+user. A client reconnecting with ?since_id=<last notification id> gets the newer
+entries replayed from the stream, or from one indexed query when the stream no
+longer reaches back that far.
+"""
+import json
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from apps.notifications.models import Notification
+from project_planner.logging import ERROR, project_logger
+
+STREAM_KEY = 'project_planner:notifications:stream:{}'
+STREAM_TTL = 60 * 60 * 24 * 7  # Streams of users who stop receiving notifications expire
+
+
+def append_to_streams(entries):
+    """
+    Append (user_id, notification_id, data) entries to the users' streams in one pipeline.
+    """
+    if not entries:
+        return
+    try:
+        pipe = get_redis_connection('default').pipeline(transaction=False)
+        for user_id, notification_id, data in entries:
+            key = STREAM_KEY.format(user_id)
+            pipe.xadd(
+                key,
+                {'id': notification_id, 'data': json.dumps(data)},
+                maxlen=settings.NOTIFICATION_REPLAY_STREAM_LENGTH,
+                approximate=True
+            )
+            pipe.expire(key, STREAM_TTL)
+        pipe.execute()
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to append notifications to replay streams: {str(e)}")
+
+
+def read_stream(user_id, since_id):
+    """
+    Return the frames of the notifications newer than since_id from the user's stream,
+    or None when the stream may be missing some of them and the database must be used.
+    """
+    try:
+        entries = get_redis_connection('default').xrange(STREAM_KEY.format(user_id))
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to read replay stream of user {user_id}: {str(e)}")
+        return None
+
+    notifications = sorted(
+        (int(fields[b'id']), fields[b'data'].decode()) for _, fields in entries
+    )
+    # The stream only proves there is no gap if it still holds entries up to since_id
+    if not notifications or notifications[0][0] > since_id:
+        return None
+    return [data for notification_id, data in notifications if notification_id > since_id]
+
+
+def read_database(user_id, since_id):
+    """
+    Return the frames of the notifications newer than since_id from the database.
+    """
+    notifications = Notification.objects.filter(
+        recipient_id=user_id, id__gt=since_id
+    ).order_by('id').only('id', 'title', 'message', 'url', 'notification_type')[:settings.NOTIFICATION_REPLAY_STREAM_LENGTH]
+    return [json.dumps({**notification.get_payload(), 'id': notification.id}) for notification in notifications]
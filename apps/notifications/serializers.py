@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from .models import Notification, NotificationPreference
+from .models import Announcement, Notification, NotificationPreference
 
 User = get_user_model()
 
@@ -28,8 +28,19 @@ class NotificationListSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Notification
-        fields = ['id', 'message', 'is_read', 'created_at', 'notification_type', 'priority']
-        read_only_fields = ['id', 'created_at']
+        fields = ['id', 'message', 'is_read', 'created_at', 'notification_type', 'priority', 'occurrence_count']
+        read_only_fields = ['id', 'created_at', 'occurrence_count']
+
+class AnnouncementSerializer(serializers.ModelSerializer):
+    """
+    Serializer for announcements broadcast to all users, with the user's read status.
+    """
+    is_read = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Announcement
+        fields = ['id', 'title', 'message', 'url', 'created_at', 'expires_at', 'is_read']
+        read_only_fields = fields
 
 class NotificationDetailSerializer(serializers.ModelSerializer):
     """
@@ -41,9 +52,10 @@ class NotificationDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Notification
-        fields = ['id', 'recipient', 'message', 'is_read', 'created_at', 
-                    'notification_type', 'status', 'priority', 'content_type', 'object_id']
-        read_only_fields = ['id', 'created_at', 'status', 'recipient', 'content_type', 'object_id']
+        fields = ['id', 'recipient', 'message', 'is_read', 'created_at', 'updated_at',
+                    'notification_type', 'status', 'priority', 'content_type', 'object_id', 'occurrence_count']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'status', 'recipient', 'content_type',
+                            'object_id', 'occurrence_count']
 
     def to_representation(self, instance):
         """
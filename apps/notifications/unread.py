@@ -0,0 +1,144 @@
+"""
+Per-user unread notification counters kept in Redis.
+
+Reads are a single GET. A missing counter (first read, expiry or Redis restart)
+is rebuilt from the database, and adjustments only touch counters that exist,
+so a counter never starts from a partial value. An adjustment that lands while
+a counter is being rebuilt discards the rebuilt value, so the next read recounts.
+"""
+import uuid
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django_redis import get_redis_connection
+from apps.notifications.models import Notification
+from project_planner.logging import ERROR, project_logger
+
+UNREAD_KEY = 'project_planner:notifications:unread:{}'
+REBUILD_KEY = 'project_planner:notifications:unread:{}:rebuild'
+UNREAD_TTL = 60 * 60 * 24 * 7  # Rebuild idle counters weekly to bound any drift
+REBUILD_TTL = 60
+
+# Add a delta to an existing counter, clamped at zero. Missing counters are left
+# alone and rebuilt on the next read, and a rebuild in progress is voided because
+# its count may miss this change.
+ADJUST_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[2])
+    return nil
+end
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if value < 0 then
+    redis.call('SET', KEYS[1], 0, 'KEEPTTL')
+    value = 0
+end
+return value
+"""
+
+# Store a recounted value only if no adjustment voided the rebuild since it started
+STORE_SCRIPT = """
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3], 'NX')
+end
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def get_unread_count(user_id):
+    """
+    Return the number of unread notifications of a user, recounting on a cache miss.
+    """
+    key, rebuild_key = UNREAD_KEY.format(user_id), REBUILD_KEY.format(user_id)
+    token = uuid.uuid4().hex
+    try:
+        value = _redis().get(key)
+        if value is not None:
+            return int(value)
+        _redis().set(rebuild_key, token, ex=REBUILD_TTL)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to read unread count of user {user_id}: {str(e)}")
+        return Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+
+    count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+    try:
+        _redis().eval(STORE_SCRIPT, 2, key, rebuild_key, token, count, UNREAD_TTL)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to store unread count of user {user_id}: {str(e)}")
+    return count
+
+
+def get_cached_unread_counts(user_ids):
+    """
+    Return {user_id: count} for the given users whose counters exist, with one MGET.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    try:
+        values = _redis().mget([UNREAD_KEY.format(user_id) for user_id in user_ids])
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to read unread counts: {str(e)}")
+        return {}
+    return {user_id: int(value) for user_id, value in zip(user_ids, values) if value is not None}
+
+
+def adjust_unread_counts(deltas):
+    """
+    Apply {user_id: delta} changes to the unread counters in one pipeline.
+    Returns {user_id: new count} for the counters that exist.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    try:
+        redis = _redis()
+        adjust = redis.register_script(ADJUST_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        for user_id, delta in deltas.items():
+            adjust(keys=[UNREAD_KEY.format(user_id), REBUILD_KEY.format(user_id)], args=[delta], client=pipe)
+        results = pipe.execute()
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to adjust unread counts, dropping them: {str(e)}")
+        reset_unread_counts(deltas)
+        return {}
+    return {user_id: int(value) for user_id, value in zip(deltas, results) if value is not None}
+
+
+def reset_unread_counts(user_ids):
+    """Drop the counters of the given users so they are recounted on the next read."""
+    if not user_ids:
+        return
+    try:
+        _redis().delete(*[
+            key.format(user_id) for user_id in user_ids for key in (UNREAD_KEY, REBUILD_KEY)
+        ])
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to reset unread counts: {str(e)}")
+
+
+def unread_count_event(count):
+    """Channel layer event handled by NotificationConsumer.send_unread_count."""
+    return {'type': 'send_unread_count', 'data': {'unread_count': count}}
+
+
+def push_unread_counts(counts):
+    """
+    Push {user_id: count} to the users' WebSocket groups in one event loop pass.
+    """
+    if not counts:
+        return
+    from apps.notifications.utils import _group_send_all
+    messages = [(f'user_{user_id}', unread_count_event(count)) for user_id, count in counts.items()]
+    try:
+        async_to_sync(_group_send_all)(get_channel_layer(), messages)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to push unread counts: {str(e)}")
+
+
+def unread_changed(deltas):
+    """Adjust the unread counters and push the new values to connected clients."""
+    push_unread_counts(adjust_unread_counts(deltas))
@@ -1,8 +1,10 @@
 from django.urls import path
 from apps.notifications.views import (
+    AnnouncementListView,
     NotificationListView,
     NotificationDetailView,
     NotificationPreferenceView,
+    NotificationUnreadCountView,
 )
 
 urlpatterns = [
@@ -11,6 +13,10 @@ urlpatterns = [
     path('', NotificationListView.as_view(), name='notification-list'),
     # Retrieve, update, or delete a specific notification
     path('<int:pk>/', NotificationDetailView.as_view(), name='notification-detail'),
+    # List active announcements and if post request is made, mark all/specific announcements as read
+    path('announcements/', AnnouncementListView.as_view(), name='announcement-list'),
+    # Number of unread notifications of the authenticated user
+    path('unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
     # Update notification preferences for the authenticated user
     path('preferences/', NotificationPreferenceView.as_view(), name='notification-preference'),
 ]
@@ -1,39 +1,403 @@
+import asyncio
+import uuid
+from datetime import timedelta
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from apps.notifications.models import Notification
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils.timezone import now
+from apps.notifications.preferences import filter_recipients
+from apps.notifications.replay import append_to_streams
+from apps.notifications.unread import adjust_unread_counts, get_cached_unread_counts, unread_count_event
+from apps.notifications.models import (
+    RETRY_LIMIT,
+    Announcement,
+    AnnouncementReceipt,
+    Notification,
+    NotificationOutbox,
+    retry_backoff
+)
+from core.side_effects import current_collector
+from project_planner.logging import ERROR, project_logger
 
-RETRY_DELAY = 60  # seconds
-def send_real_time_notification(user, message, notification_type, content_type, object_id):
+BULK_CREATE_BATCH_SIZE = 1000
+OUTBOX_BATCH_SIZE = 1000
+OUTBOX_CLAIM_TIMEOUT = 300  # seconds before entries claimed by a crashed dispatcher are picked up again
+GROUP_SEND_BATCH_SIZE = 500  # concurrent group_send calls per gather
+ANNOUNCEMENTS_GROUP = 'announcements'  # joined by every NotificationConsumer
+
+
+async def _group_send_all(channel_layer, messages):
     """
-    Sends a real-time WebSocket notification and saves it to the database.
+    Push (group_name, event) pairs in one event loop pass.
+    Returns the indexes of the messages that could not be sent.
     """
-    channel_layer = get_channel_layer()
+    failed = []
+    for start in range(0, len(messages), GROUP_SEND_BATCH_SIZE):
+        batch = messages[start:start + GROUP_SEND_BATCH_SIZE]
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group_name, event) for group_name, event in batch),
+            return_exceptions=True
+        )
+        failed.extend(start + index for index, result in enumerate(results) if isinstance(result, Exception))
+    return failed
 
-    notification = Notification.objects.create(
-        recipient=user,
-        message=message['body'],
-        notification_type=notification_type,
-        content_type_id=content_type,
-        object_id=object_id,
-        status="pending"
+
+def send_bulk_notifications(recipients, message, notification_type, content_type=None, object_id=None, sender=None):
+    """
+    Saves the same notification for many recipients and queues its WebSocket push.
+    Recipients who disabled the notification type in their preferences are skipped, and
+    repeated events on the same object are coalesced into the recipient's unread notification.
+    The notifications and their outbox entries are written with one bulk_create each,
+    inside the caller's transaction. The push itself is done by the outbox dispatcher
+    once the transaction commits.
+    Inside a deferred_side_effects() block the notifications are queued and written
+    when the block's transaction commits.
+    Args:
+        recipients: Users or user IDs to notify.
+        message (dict): Message with 'title', 'body' and optional 'url'.
+    Returns the number of recipients notified.
+    """
+    # Deduplicate while keeping the order of the recipients
+    recipient_ids = list(dict.fromkeys(getattr(recipient, 'pk', recipient) for recipient in recipients))
+    if not recipient_ids:
+        return 0
+
+    collector = current_collector()
+    if collector is not None:
+        collector.queue_notification(
+            recipients=recipient_ids, message=message, notification_type=notification_type,
+            content_type=content_type, object_id=object_id, sender=sender
+        )
+        return len(recipient_ids)
+
+    # Drop the recipients who disabled this notification type before writing anything
+    recipient_ids = filter_recipients(recipient_ids, notification_type)
+    if not recipient_ids:
+        return 0
+
+    payload = {
+        'title': message['title'],
+        'body': message['body'],
+        'url': message.get('url'),
+    }
+    with transaction.atomic():
+        coalesced = _coalesce(recipient_ids, payload, notification_type, content_type, object_id)
+        recipient_ids = [recipient_id for recipient_id in recipient_ids if recipient_id not in coalesced]
+        if not recipient_ids:
+            return len(coalesced)
+
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=recipient_id,
+                    sender=sender,
+                    title=payload['title'],
+                    message=payload['body'],
+                    url=payload['url'] or '',
+                    notification_type=notification_type,
+                    content_type_id=content_type,
+                    object_id=object_id,
+                    status='pending'
+                )
+                for recipient_id in recipient_ids
+            ],
+            batch_size=BULK_CREATE_BATCH_SIZE
+        )
+        NotificationOutbox.objects.bulk_create(
+            [NotificationOutbox(notification=notification, payload=payload) for notification in notifications],
+            batch_size=BULK_CREATE_BATCH_SIZE
+        )
+        transaction.on_commit(lambda: adjust_unread_counts({recipient_id: 1 for recipient_id in recipient_ids}))
+        transaction.on_commit(_schedule_dispatch)
+        if settings.NOTIFICATION_TRIM_ON_INSERT:
+            transaction.on_commit(lambda: _schedule_trim(recipient_ids))
+
+    return len(notifications) + len(coalesced)
+
+
+def _coalesce(recipient_ids, payload, notification_type, content_type, object_id):
+    """
+    Fold the event into the recipients' unread notification about the same object,
+    if one was updated within the last NOTIFICATION_COALESCE_WINDOW seconds. The row's
+    count and latest message are updated instead of inserting a new row. A push still
+    waiting in the outbox carries the latest message, and rows already pushed get one
+    new push, so each row has at most one push waiting however many events coalesce.
+    Returns the set of recipients whose notification was coalesced.
+    """
+    window = settings.NOTIFICATION_COALESCE_WINDOW
+    if not window or content_type is None or object_id is None:
+        return set()
+
+    existing = dict(
+        Notification.objects.select_for_update().filter(
+            recipient_id__in=recipient_ids,
+            content_type_id=content_type,
+            object_id=object_id,
+            notification_type=notification_type,
+            is_read=False,
+            updated_at__gte=now() - timedelta(seconds=window),
+        ).order_by('updated_at').values_list('recipient_id', 'id')
+    )  # Ascending, so the most recently updated row of each recipient wins
+    if existing:
+        Notification.objects.filter(id__in=existing.values()).update(
+            title=payload['title'],
+            message=payload['body'],
+            url=payload['url'] or '',
+            occurrence_count=F('occurrence_count') + 1,
+            updated_at=now(),
+        )
+        waiting = NotificationOutbox.objects.filter(notification_id__in=existing.values())
+        # An entry being pushed is released, so the dispatcher leaves it queued with the new payload
+        waiting.update(payload=payload, claimed_at=None, claimed_by='')
+        pushed = set(existing.values()) - set(waiting.values_list('notification_id', flat=True))
+        if pushed:
+            NotificationOutbox.objects.bulk_create(
+                [NotificationOutbox(notification_id=notification_id, payload=payload) for notification_id in pushed],
+                ignore_conflicts=True
+            )
+            Notification.objects.filter(id__in=pushed).update(status='pending', retry_count=0, last_attempt_at=None)
+            transaction.on_commit(_schedule_dispatch)
+    return set(existing)
+
+
+def _schedule_dispatch():
+    """
+    Wake the dispatcher right after a commit. The periodic dispatch picks the rows
+    up anyway if the broker is unavailable.
+    """
+    from core.tasks import dispatch_notification_outbox
+    try:
+        dispatch_notification_outbox.delay()
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to schedule notification dispatch: {str(e)}")
+
+
+def _schedule_trim(recipient_ids):
+    """Keep the recipients of new notifications within the retention cap."""
+    from core.tasks import trim_notifications
+    try:
+        trim_notifications.delay(recipient_ids)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to schedule notification trim: {str(e)}")
+
+
+def retry_due(current_time, prefix=''):
+    """
+    Q object matching notifications that were never attempted or whose backoff
+    after the last failed attempt has passed. Prefix is the lookup path to the
+    notification, e.g. 'notification__' from the outbox.
+    """
+    due = Q(**{f'{prefix}last_attempt_at__isnull': True})
+    for retry_count in range(RETRY_LIMIT):
+        due |= Q(**{
+            f'{prefix}retry_count': retry_count,
+            f'{prefix}last_attempt_at__lte': current_time - timedelta(seconds=retry_backoff(retry_count)),
+        })
+    return due
+
+
+def dispatch_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Push one batch of queued notifications and mark them delivered or failed.
+    The batch is claimed with a single conditional UPDATE first, so concurrent
+    dispatchers never push the same entry, also on databases that ignore
+    select_for_update. Failed pushes stay in the outbox and are retried with
+    exponential backoff (see retry_backoff). After RETRY_LIMIT attempts they are
+    dead-lettered.
+    Returns a tuple of (delivered, failed) counts.
+    """
+    current_time = now()
+    claimable = Q(claimed_at__isnull=True) | Q(claimed_at__lt=current_time - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT))
+    candidates = list(
+        NotificationOutbox.objects.filter(claimable, retry_due(current_time, 'notification__'))
+        .order_by('id').values_list('id', flat=True)[:batch_size]
     )
+    if not candidates:
+        return 0, 0
+    token = uuid.uuid4().hex
+    # Only the rows this UPDATE still finds unclaimed belong to this dispatcher
+    NotificationOutbox.objects.filter(claimable, id__in=candidates).update(claimed_at=current_time, claimed_by=token)
+    entries = list(
+        NotificationOutbox.objects.select_related('notification').filter(claimed_by=token).order_by('id')
+    )
+    if not entries:
+        return 0, 0
 
+    frames = [{**entry.payload, 'id': entry.notification_id} for entry in entries]
+    messages = [
+        (f'user_{entry.notification.recipient_id}', {'type': 'send_notification', 'data': data})
+        for entry, data in zip(entries, frames)
+    ]
+    # Keep a copy for replay to clients that reconnect, written on the first attempt only
+    append_to_streams([
+        (entry.notification.recipient_id, entry.notification_id, data)
+        for entry, data in zip(entries, frames)
+        if entry.notification.last_attempt_at is None
+    ])
+    # The recipients' new unread counts ride along in the same pass
+    unread_counts = get_cached_unread_counts({entry.notification.recipient_id for entry in entries})
+    messages.extend((f'user_{user_id}', unread_count_event(count)) for user_id, count in unread_counts.items())
     try:
-        async_to_sync(channel_layer.group_send)(
-            f'user_{user.id}',
-            {
-                'type': 'send_notification',
-                'data': {
-                    'title': message['title'],
-                    'body': message['body'],
-                    'url': message.get('url'),
-                }
-            }
+        failed_indexes = set(async_to_sync(_group_send_all)(get_channel_layer(), messages))
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to push {len(entries)} notifications: {str(e)}")
+        failed_indexes = set(range(len(entries)))
+
+    with transaction.atomic():
+        # Entries released by a coalesced event while being pushed stay queued with their new payload
+        claimed = set(
+            NotificationOutbox.objects.select_for_update().filter(claimed_by=token).values_list('id', flat=True)
+        )
+        delivered = [entry for index, entry in enumerate(entries) if index not in failed_indexes and entry.id in claimed]
+        failed = [entry for index, entry in enumerate(entries) if index in failed_indexes and entry.id in claimed]
+        # Entries that used up their attempts leave the outbox and their notification is dead-lettered
+        exhausted = [entry for entry in failed if entry.notification.retry_count + 1 >= RETRY_LIMIT]
+
+        Notification.objects.filter(pk__in=[entry.notification_id for entry in delivered]).update(
+            status='delivered', last_attempt_at=current_time
+        )
+        Notification.objects.filter(pk__in=[entry.notification_id for entry in failed]).update(
+            status='failed', retry_count=F('retry_count') + 1, last_attempt_at=current_time
+        )
+        Notification.objects.filter(pk__in=[entry.notification_id for entry in exhausted]).update(status='dead')
+        NotificationOutbox.objects.filter(pk__in=[entry.id for entry in delivered + exhausted]).delete()
+        # The rest is released for its next attempt after the backoff
+        NotificationOutbox.objects.filter(claimed_by=token).update(claimed_at=None, claimed_by='')
+
+    return len(delivered), len(failed)
+
+
+def requeue_failed(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Sweep one batch of failed or pending notifications that have no outbox entry
+    and are due for a retry back into the outbox, and dead-letter the ones that
+    used up their attempts.
+    Returns a tuple of (requeued, dead_lettered) counts.
+    """
+    current_time = now()
+    orphans = Notification.objects.filter(
+        status__in=['failed', 'pending'], outbox_entry__isnull=True
+    )
+    with transaction.atomic():
+        dead_lettered = Notification.objects.filter(
+            pk__in=list(orphans.filter(retry_count__gte=RETRY_LIMIT).values_list('pk', flat=True)[:batch_size])
+        ).update(status='dead')
+
+        due = list(
+            orphans.select_for_update(skip_locked=True, of=('self',))
+            .filter(retry_due(current_time), retry_count__lt=RETRY_LIMIT)
+            # Rows are written with their outbox entry, so give fresh ones time to commit
+            .filter(created_at__lte=current_time - timedelta(seconds=retry_backoff(0)))
+            .order_by('last_attempt_at', 'id')
+            .only('id', 'title', 'message', 'url', 'notification_type')[:batch_size]
         )
-        notification.status = 'delivered'
-    except Exception:
-        notification.status = 'failed'
-        from core.tasks import retry_failed_notifications
-        retry_failed_notifications.apply_async((notification.id,), countdown=RETRY_DELAY)
-    finally:
-        notification.save()
\ No newline at end of file
+        NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(notification_id=notification.id, payload=notification.get_payload())
+            for notification in due
+        ], ignore_conflicts=True)
+        Notification.objects.filter(pk__in=[notification.id for notification in due]).update(status='pending')
+        if due:
+            transaction.on_commit(_schedule_dispatch)
+
+    return len(due), dead_lettered
+
+
+def push_digests(since):
+    """
+    Push one digest frame per recipient listing the unread notifications that
+    coalesced new events since the given time.
+    Returns the number of recipients that received a digest.
+    """
+    digests = {}
+    for row in Notification.objects.filter(
+        updated_at__gt=since, occurrence_count__gt=1, is_read=False
+    ).order_by('recipient_id', '-updated_at').values(
+        'id', 'recipient_id', 'message', 'notification_type', 'occurrence_count'
+    ).iterator(chunk_size=2000):
+        digests.setdefault(row['recipient_id'], []).append({
+            'id': row['id'],
+            'message': row['message'],
+            'notification_type': row['notification_type'],
+            'count': row['occurrence_count'],
+        })
+    if not digests:
+        return 0
+
+    messages = [
+        (f'user_{recipient_id}', {'type': 'send_digest', 'data': {'digest': items}})
+        for recipient_id, items in digests.items()
+    ]
+    try:
+        failed = async_to_sync(_group_send_all)(get_channel_layer(), messages)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to push notification digests: {str(e)}")
+        return 0
+    return len(messages) - len(failed)
+
+
+def active_announcements(user):
+    """
+    Return the announcements that have not expired, annotated with the user's read status.
+    """
+    return Announcement.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now())
+    ).annotate(
+        is_read=Exists(AnnouncementReceipt.objects.filter(announcement=OuterRef('pk'), user=user))
+    )
+
+
+def send_announcement(message, sender=None, expires_at=None):
+    """
+    Broadcast a notification to every user with a single stored row and a single
+    group_send to the announcements group, pushed once the transaction commits.
+    Args:
+        message (dict): Message with 'title', 'body' and optional 'url'.
+        expires_at (datetime): Defaults to NOTIFICATION_ANNOUNCEMENT_TTL_DAYS from now.
+    Returns the created Announcement.
+    """
+    if expires_at is None and settings.NOTIFICATION_ANNOUNCEMENT_TTL_DAYS:
+        expires_at = now() + timedelta(days=settings.NOTIFICATION_ANNOUNCEMENT_TTL_DAYS)
+    announcement = Announcement.objects.create(
+        sender=sender,
+        title=message['title'],
+        message=message['body'],
+        url=message.get('url') or '',
+        expires_at=expires_at,
+    )
+    # Same fields as the announcements endpoint, under their own key like digests
+    event = {
+        'type': 'send_announcement',
+        'data': {
+            'announcement': {
+                'id': announcement.id,
+                'title': announcement.title,
+                'message': announcement.message,
+                'url': announcement.url or None,
+                'created_at': announcement.created_at.isoformat(),
+                'expires_at': announcement.expires_at.isoformat() if announcement.expires_at else None,
+            }
+        }
+    }
+
+    def push():
+        try:
+            async_to_sync(get_channel_layer().group_send)(ANNOUNCEMENTS_GROUP, event)
+        except Exception as e:
+            project_logger.log(ERROR, f"Failed to push announcement {announcement.id}: {str(e)}")
+
+    transaction.on_commit(push)
+    return announcement
+
+
+def send_real_time_notification(user, message, notification_type, content_type, object_id):
+    """
+    Saves a notification and queues its real-time WebSocket push.
+    Inside a deferred_side_effects() block the notification is queued and sent
+    when the block's transaction commits.
+    """
+    send_bulk_notifications(
+        [user], message, notification_type,
+        content_type=content_type, object_id=object_id
+    )
@@ -1,16 +1,31 @@
 # local imports
-from apps.notifications.models import Notification, NotificationPreference
+from apps.notifications.models import (
+    AnnouncementReceipt,
+    ArchivedNotification,
+    Notification,
+    NotificationPreference
+)
 from apps.notifications.serializers import (
+    AnnouncementSerializer,
     NotificationListSerializer,
     NotificationDetailSerializer,
     NotificationPreferenceSerializer
 )
 from apps.notifications.filters import NotificationFilter
+from apps.notifications.unread import get_unread_count, unread_changed
+from apps.notifications.utils import active_announcements
+from core.pagination import OptInCursorPagination
+# django imports
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 # third-party imports
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from rest_framework import generics, permissions, status, filters
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 
 class NotificationListView(generics.ListAPIView):
@@ -24,6 +39,8 @@ class NotificationListView(generics.ListAPIView):
     filterset_class = NotificationFilter
     ordering_fields = ['created_at', 'priority']
     ordering = ['-created_at']
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """
@@ -31,13 +48,58 @@ class NotificationListView(generics.ListAPIView):
         """
         return Notification.objects.filter(recipient=self.request.user)
 
+    def reads_archive(self):
+        """
+        Check whether the created_at range filter reaches back past the archive cutoff.
+        """
+        cutoff = timezone.now() - timedelta(days=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS)
+        for param in ('created_at_after', 'created_at_before'):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            parsed = parse_datetime(value)
+            if parsed is None:
+                date = parse_date(value)
+                if date is None:
+                    continue
+                parsed = datetime(date.year, date.month, date.day)
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            if parsed < cutoff:
+                return True
+        return False
+
+    def filter_queryset(self, queryset):
+        """
+        Apply the filters and, for old created_at ranges, merge in the archived notifications.
+        """
+        queryset = super().filter_queryset(queryset)
+        if not self.reads_archive():
+            return queryset
+
+        archived = NotificationFilter(
+            self.request.query_params,
+            queryset=ArchivedNotification.objects.filter(recipient=self.request.user),
+            request=self.request
+        ).qs
+        ordering = filters.OrderingFilter().get_ordering(self.request, queryset, self) or self.ordering
+        fields = NotificationListSerializer.Meta.fields
+        # The merged rows come from two tables, so they are paged by page number
+        self.cursor_ordering = None
+        return queryset.order_by().values(*fields).union(
+            archived.order_by().values(*fields), all=True
+        ).order_by(*ordering)
+
     @extend_schema(
         summary="List Notifications",
         parameters=[
             OpenApiParameter(name='is_read', type=bool, description='Filter by read status'),
+            OpenApiParameter(name='created_at_after', type=str, description='Only notifications created after this time. Older ranges include archived notifications'),
+            OpenApiParameter(name='created_at_before', type=str, description='Only notifications created before this time'),
             OpenApiParameter(name='notification_type', type=str, description='Filter by notification type'),
             OpenApiParameter(name='priority', type=str, description='Filter by priority'),
             OpenApiParameter(name='ordering', type=str, description='Order by field (e.g. created_at, -priority)'),
+            OpenApiParameter(name='pagination', type=str, description="Set to 'cursor' for cursor pagination"),
         ],
         responses={
             200: NotificationListSerializer(many=True),
@@ -82,14 +144,14 @@ class NotificationListView(generics.ListAPIView):
         Handle POST request to mark notifications as read.
         """
         ids = request.data.get('ids', [])
+        queryset = Notification.objects.filter(is_read=False, recipient=request.user)
         if ids:
-            queryset = Notification.objects.filter(id__in=ids, recipient=request.user)
-        else:
-            # Mark all unread notifications as read
-            queryset = Notification.objects.filter(is_read=False, recipient=request.user)
-        
+            queryset = queryset.filter(id__in=ids)
+        # Otherwise mark all unread notifications as read
+
         marked_count = queryset.update(is_read=True)
-        
+        unread_changed({request.user.id: -marked_count})
+
         return Response({
             "message": f"{marked_count} notification(s) marked as read.",
             "code": status.HTTP_200_OK,
@@ -97,6 +159,87 @@ class NotificationListView(generics.ListAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class AnnouncementListView(generics.ListAPIView):
+    """
+    API view to list the announcements sent to all users that have not expired.
+    Kept apart from the notification list, which is read from the user's own rows.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = AnnouncementSerializer
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        """
+        Return the active announcements with the authenticated user's read status.
+        """
+        return active_announcements(self.request.user).order_by('-created_at', '-id')
+
+    @extend_schema(
+        summary="List Announcements",
+        parameters=[
+            OpenApiParameter(name='pagination', type=str, description="Set to 'cursor' for cursor pagination"),
+        ],
+        responses={
+            200: AnnouncementSerializer(many=True),
+        }
+    )
+    def list(self, request, *args, **kwargs):
+        """
+        List the active announcements.
+        """
+        announcements = super().list(request, *args, **kwargs)
+        return Response({
+            "message": "Announcements fetched successfully.",
+            "code": status.HTTP_200_OK,
+            "data": announcements.data
+        }, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Mark Announcements as Read",
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'ids': {
+                        'type': 'array',
+                        'items': {'type': 'integer'},
+                        'description': 'List of announcement IDs to mark as read. If empty, all unread announcements will be marked as read.',
+                    }
+                },
+                'example': {'ids': [1, 2]}
+            }
+        },
+        responses={
+            200: {
+                "message": "2 announcement(s) marked as read.",
+                "code": 200,
+                "data": {"marked_count": 2}
+            }
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        """
+        Handle POST request to mark announcements as read.
+        """
+        ids = request.data.get('ids', [])
+        announcements = active_announcements(request.user).filter(is_read=False)
+        if ids:
+            announcements = announcements.filter(id__in=ids)
+        # Otherwise mark all unread announcements as read
+
+        receipts = AnnouncementReceipt.objects.bulk_create([
+            AnnouncementReceipt(announcement_id=announcement_id, user=request.user)
+            for announcement_id in announcements.values_list('id', flat=True)
+        ], ignore_conflicts=True)
+
+        return Response({
+            "message": f"{len(receipts)} announcement(s) marked as read.",
+            "code": status.HTTP_200_OK,
+            "data": {"marked_count": len(receipts)}
+        }, status=status.HTTP_200_OK)
+
+
 class NotificationDetailView(generics.RetrieveUpdateAPIView):
     """
     API view to retrieve and update a specific notification.
@@ -110,6 +253,15 @@ class NotificationDetailView(generics.RetrieveUpdateAPIView):
         """
         return Notification.objects.filter(recipient=self.request.user)
 
+    def perform_update(self, serializer):
+        """
+        Save the notification and keep the unread counter in sync with its read status.
+        """
+        was_read = serializer.instance.is_read
+        notification = serializer.save()
+        if notification.is_read != was_read:
+            unread_changed({notification.recipient_id: -1 if notification.is_read else 1})
+
     @extend_schema(
         summary="Retrieve Notification Details",
         responses={
@@ -164,6 +316,35 @@ class NotificationDetailView(generics.RetrieveUpdateAPIView):
         }, status=status.HTTP_200_OK)
 
 
+class NotificationUnreadCountView(APIView):
+    """
+    API view to get the number of unread notifications of the authenticated user.
+    Served from a Redis counter, so clients can poll it for badges cheaply.
+    Announcements are not in the counter, their unread count is queried separately.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="Get Unread Notification Count",
+        responses={
+            200: {
+                "message": "Unread notification count fetched successfully.",
+                "code": 200,
+                "data": {"unread_count": 3, "unread_announcements": 1}
+            }
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return Response({
+            "message": "Unread notification count fetched successfully.",
+            "code": status.HTTP_200_OK,
+            "data": {
+                "unread_count": get_unread_count(request.user.id),
+                "unread_announcements": active_announcements(request.user).filter(is_read=False).count(),
+            }
+        }, status=status.HTTP_200_OK)
+
+
 class NotificationPreferenceView(generics.RetrieveUpdateAPIView):
     """
     API view to retrieve and update notification preferences for the authenticated user.
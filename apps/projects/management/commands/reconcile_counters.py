@@ -0,0 +1,152 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from apps.projects.models import Project, ProjectMembership
+from apps.tasks.models import Comment, Task, TaskAssignment
+from apps.users.models import Profile
+from core import counters
+
+# Table name -> (model, recount function)
+TABLES = {
+    'projects': (Project, counters.recount_projects),
+    'memberships': (ProjectMembership, counters.recount_memberships),
+    'tasks': (Task, counters.recount_tasks),
+    'comments': (Comment, counters.recount_comments),
+    'profiles': (Profile, counters.recount_profiles),
+}
+
+
+def scoped_queryset(table, since=None):
+    """
+    Return the rows of a table whose counters may have changed since the given time.
+    Without `since` every row is returned.
+    Rows are selected by recent creation or modification only, so counters that drifted
+    through deletions (whose rows are gone) are left to a full pass.
+    """
+    model, _ = TABLES[table]
+    if since is None:
+        return model.objects.all()
+
+    recent_projects = Project.objects.filter(
+        Q(updated_at__gte=since) |
+        Q(id__in=Task.objects.filter(updated_at__gte=since).values('project_id')) |
+        Q(id__in=ProjectMembership.objects.filter(joined_at__gte=since).values('project_id'))
+    ).values('id')
+
+    if table == 'projects':
+        return Project.objects.filter(id__in=recent_projects)
+    if table == 'memberships':
+        return ProjectMembership.objects.filter(project_id__in=recent_projects)
+    if table == 'tasks':
+        return Task.objects.filter(
+            Q(updated_at__gte=since) |
+            Q(id__in=TaskAssignment.objects.filter(assigned_at__gte=since).values('task_id'))
+        )
+    if table == 'comments':
+        return Comment.objects.filter(
+            Q(updated_at__gte=since) |
+            Q(id__in=Comment.objects.filter(created_at__gte=since, parent__isnull=False).values('parent_id'))
+        )
+    return Profile.objects.filter(
+        Q(user_id__in=Project.objects.filter(id__in=recent_projects).values('owner_id')) |
+        Q(user_id__in=ProjectMembership.objects.filter(joined_at__gte=since).values('user_id'))
+    )
+
+
+def reconcile_range(table, start, end, since, dry_run):
+    """
+    Recount the rows of a table with start <= id < end.
+    Runs inside a worker process and returns the number of drifted rows.
+    """
+    _, recount = TABLES[table]
+    queryset = scoped_queryset(table, since).filter(pk__gte=start, pk__lt=end)
+    drifted = len(recount(queryset, dry_run=dry_run))
+    connections.close_all()
+    return drifted
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every denormalized counter with grouped aggregate queries and "
+        "correct the rows that drifted. Safe to schedule nightly, use --since for cheaper "
+        "incremental runs between full passes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drifted rows without writing corrections.")
+        parser.add_argument(
+            '--since',
+            help=(
+                "Only reconcile rows touched since this time. Accepts an ISO date/datetime or a relative "
+                "value like 24h or 7d. Only creations and updates are detected, drift caused by deletions "
+                "needs a full pass without --since."
+            )
+        )
+        parser.add_argument('--tables', nargs='+', choices=list(TABLES), default=list(TABLES), help="Tables to reconcile.")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Number of ids per range handed to a worker.")
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of worker processes. Defaults to the CPU count, or 1 on SQLite."
+        )
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options['since'])
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        if workers is None:
+            workers = 1 if connection.vendor == 'sqlite' else (os.cpu_count() or 1)
+
+        # Split every table into id ranges before any process is forked
+        jobs = []
+        for table in options['tables']:
+            bounds = scoped_queryset(table, since).aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                continue
+            for start in range(bounds['low'], bounds['high'] + 1, chunk_size):
+                jobs.append((table, start, start + chunk_size, since, dry_run))
+
+        drifted = {table: 0 for table in options['tables']}
+        if workers > 1 and len(jobs) > 1:
+            # Forked workers must not share the parent's database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('fork')) as executor:
+                for (table, *_), count in zip(jobs, executor.map(reconcile_range, *zip(*jobs))):
+                    drifted[table] += count
+        else:
+            for job in jobs:
+                drifted[job[0]] += reconcile_range(*job)
+
+        verb = "would be corrected" if dry_run else "corrected"
+        for table, count in drifted.items():
+            self.stdout.write(f"{table}: {count} drifted row(s) {verb}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {len(jobs)} range(s), {sum(drifted.values())} drifted row(s) {verb}."
+        ))
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        match = re.fullmatch(r'(\d+)([hd])', value)
+        if match:
+            amount, unit = int(match.group(1)), match.group(2)
+            return timezone.now() - (timedelta(hours=amount) if unit == 'h' else timedelta(days=amount))
+
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f"Invalid --since value: {value}")
+            parsed = datetime(date.year, date.month, date.day)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
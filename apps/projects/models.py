@@ -1,5 +1,5 @@
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
@@ -39,16 +39,36 @@ class Project(models.Model):
     due_date = models.DateTimeField(null=True, blank=True)  # Optional due date for the project
     total_member_count = models.PositiveIntegerField(default=1)  # Total members in the project (including the owner)
     admin_override = models.BooleanField(default=False)  # Flag to check admin override of project details (e.g., increase member count)
+
+    # Kept up to date by core.counters and the count methods below, never written back
+    # from an instance that may have been loaded before the counts changed
+    COUNTER_FIELDS = {'total_tasks', 'total_member_count'}
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Save without the counter columns unless they are named in update_fields, in one
+        transaction with the counter signal handlers.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()  # Like Django, only loaded fields are written
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def update_task_counts(self):
         """
         Updates the total number of tasks in the project by counting associated tasks.
         This should be called whenever tasks are added or removed.
         """
         self.total_tasks = self.tasks.count()
-        self.save()
+        self.save(update_fields=['total_tasks'])
 
     def update_member_count(self):
         """
@@ -56,7 +76,7 @@ class Project(models.Model):
         This should be called whenever members are added or removed.
         """
         self.total_member_count = self.memberships.count()
-        self.save()
+        self.save(update_fields=['total_member_count'])
     def can_create_task(self):
         """Check if tasks can be created based on project status"""
         return self.status in ['in_progress', 'overdue']
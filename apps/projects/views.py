@@ -6,7 +6,7 @@ from apps.projects.serializers import (
     ProjectInvitationSerializer, ProjectInvitationAcceptSerializer
 )
 from apps.projects.filters import ProjectFilter
-from apps.notifications.utils import send_real_time_notification
+from apps.notifications.utils import send_bulk_notifications, send_real_time_notification
 from core.permissions import IsProjectMember,IsProjectOwner
 from core.services.mail_service import EmailService
 
@@ -35,27 +35,35 @@ class InvitationEmailMixin:
         """
         Sends an email invitation to the user for joining a project.
         """
-        email_service = EmailService()
+        self.send_invitation_batch(request, [invitation])
 
-        # Build the acceptance URL
-        accept_url = request.build_absolute_uri(
-            reverse('project-invitation-accept')
-        ) + f'?token={invitation.token}'
-
-        # Construct the email content
-        subject = f"Invitation to join project: {invitation.project.name}"
-        message_body = f"""
-        <h2 style="color: #4CAF50;">You're Invited to Join a Project!</h2>
-        <p>Dear User,</p>
-        <p>You've been invited to join the project "{invitation.project.name}" by {invitation.invited_by.get_full_name()}.</p>
-        <p>To accept this invitation, please click on the following link:</p>
-        <p><a href="{accept_url}" style="color: #4CAF50;">Accept Invitation</a></p>
-        <p>This invitation will expire on {invitation.expires_at.strftime('%Y-%m-%d %H:%M:%S')}.</p>
-        <p>If you don't have an account, you'll be able to create one when you click the link.</p>
+    def send_invitation_batch(self, request, invitations):
         """
+        Sends the invitation emails of many invitations in batches.
+        The email is rendered once per project and inviter, only the
+        acceptance link and expiry differ between recipients.
+        """
+        # Build the acceptance URL
+        accept_url = request.build_absolute_uri(reverse('project-invitation-accept'))
+        email_service = EmailService()
 
-        # Send the email
-        email_service.send_custom_email(subject, message_body, invitation.email)
+        groups = {}
+        for invitation in invitations:
+            groups.setdefault((invitation.project_id, invitation.invited_by_id), []).append(invitation)
+        for group in groups.values():
+            project, invited_by = group[0].project, group[0].invited_by
+            email_service.send_template_emails(
+                f"Invitation to join project: {project.name}",
+                'project_invitation',
+                {'project_name': project.name, 'invited_by': invited_by.get_full_name()},
+                (
+                    (invitation.email, {
+                        'accept_url': f'{accept_url}?token={invitation.token}',
+                        'expires_at': invitation.expires_at.strftime('%Y-%m-%d %H:%M:%S'),
+                    })
+                    for invitation in group
+                )
+            )
 
 @extend_schema_view(
     # Define schema for the `list` method
@@ -161,25 +169,23 @@ class ProjectListCreateView(generics.ListCreateAPIView):
                 f"Your plan allows a maximum of {plan.max_projects} projects. Upgrade your plan to create more projects."
             )
         # Save the project and associate it with the owner
+        # The owner's project count is updated by the counter signals
         project = serializer.save(owner=self.request.user)
-        user.profile.owned_projects_count += 1  # Increment the owner's project count
-        user.profile.save()
 
         members = serializer.validated_data.get('members', [])  # Get project members
         request = self.request
         # Notify members about their assignment to the project
-        for member in members:
-            send_real_time_notification(
-                user=member,
-                message={
-                    "title": "New Project Assigned",
-                    "body": f"You have been added to the project '{project.name}'.",
-                    "url": request.build_absolute_uri(reverse('project-retrieve-update-destroy', kwargs={'pk': project.id}))
-                },
-                notification_type="project",  # Notification type
-                content_type=ContentType.objects.get_for_model(Project).id,  # Reference model
-                object_id=project.id  # Reference project
-            )
+        send_bulk_notifications(
+            members,
+            message={
+                "title": "New Project Assigned",
+                "body": f"You have been added to the project '{project.name}'.",
+                "url": request.build_absolute_uri(reverse('project-retrieve-update-destroy', kwargs={'pk': project.id}))
+            },
+            notification_type="project",  # Notification type
+            content_type=ContentType.objects.get_for_model(Project).id,  # Reference model
+            object_id=project.id  # Reference project
+        )
 
     def list(self, request, *args, **kwargs):
         # Handle listing of projects
@@ -1,6 +1,6 @@
 import re
 from django.utils import timezone
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from apps.projects.models import Project
 from django.db.models import F
@@ -45,11 +45,31 @@ class Task(models.Model):
         indexes = [  # Indexes for optimizing frequent queries
             models.Index(fields=["due_date"]),
             models.Index(fields=["status"]),
+            models.Index(fields=["-created_at", "-id"]),  # Cursor pagination keyset
         ]
 
+    # Kept up to date by core.counters, never written back from an instance that may
+    # have been loaded before the count changed
+    COUNTER_FIELDS = {'total_assignees'}
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        Save without the counter columns unless they are named in update_fields, in one
+        transaction with the counter signal handlers.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()  # Like Django, only loaded fields are written
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class TaskAssignment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="assignments")
@@ -109,6 +129,9 @@ class Comment(models.Model):
             models.Index(fields=['task']),
             models.Index(fields=['author']),
             models.Index(fields=['created_at']),
+            # Cursor pagination keysets for top-level comments of a task and for replies
+            models.Index(fields=['task', 'parent', '-created_at', '-id']),
+            models.Index(fields=['parent', '-created_at', '-id']),
         ]
 
     def __str__(self):
@@ -4,6 +4,8 @@ from apps.projects.models import Project, ProjectMembership
 from apps.projects.serializers import ProjectMembershipSerializer
 from apps.tasks.models import Task, TaskAssignment, Comment, StatusChangeRequest
 from apps.users.serializers import CustomUserSerializer, DetailedUserSerializer
+from core import counters
+from core.side_effects import deferred_side_effects
 # django imports
 from django.contrib.auth import get_user_model
 from django.utils  import timezone
@@ -130,9 +132,9 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             for user in assignees
         ])
 
-        # Update total_assignees count
+        # bulk_create skips signals, so apply the counter deltas directly
+        counters.assignments_changed(task.id, [user.id for user in assignees], 1)
         task.total_assignees = len(assignees)
-        task.save(update_fields=['total_assignees'])
         return task
 
     def to_representation(self, instance):
@@ -177,43 +179,39 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """
         Partially update task fields and manage assignees with optimized database queries.
+        Counter updates and notifications are applied once after the transaction commits.
         """
         assignees = validated_data.pop('assignees', None)
         new_assignees = []
         removed_assignees = []
-        # Update task fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        print(instance.status)
-        if assignees is not None:
-            # Get the current assignees (users already assigned to the task)
-            current_assignees = set(instance.assignments.values_list('user', flat=True))
-            new_assignees_set = set(assignee.id for assignee in assignees)
-
-
-            to_remove = current_assignees - new_assignees_set
-            to_add = new_assignees_set - current_assignees
-            
-            if to_remove:
-                # Remove assignees
-                TaskAssignment.objects.filter(task=instance, user__in=to_remove).delete()
-                to_remove = list(to_remove)
-                
-            if to_add:
-                for user_id in to_add:
-                    TaskAssignment.objects.create(task=instance, user_id=user_id)
-                to_add = list(to_add)
-            
-
-            # Update total_assignees count
-            instance.total_assignees = len(assignees)
-
-            # Save the task instance
-            instance.save()
+        with transaction.atomic(), deferred_side_effects():
+            # Update task fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if assignees is not None:
+                # Get the current assignees (users already assigned to the task)
+                current_assignees = set(instance.assignments.values_list('user', flat=True))
+                new_assignees_set = set(assignee.id for assignee in assignees)
+
+                to_remove = list(current_assignees - new_assignees_set)
+                to_add = list(new_assignees_set - current_assignees)
+
+                if to_remove:
+                    # Remove assignees
+                    TaskAssignment.objects.filter(task=instance, user__in=to_remove).delete()
+
+                if to_add:
+                    TaskAssignment.objects.bulk_create(
+                        [TaskAssignment(task=instance, user_id=user_id) for user_id in to_add]
+                    )
+                    counters.assignments_changed(instance.id, to_add, 1)
 
-            self.context['new_assignees'] = User.objects.filter(id__in=to_add)
-            self.context['removed_assignees'] = User.objects.filter(id__in=to_remove)
-        instance.save()
+                # Update total_assignees count
+                instance.total_assignees = len(assignees)
+
+                self.context['new_assignees'] = User.objects.filter(id__in=to_add)
+                self.context['removed_assignees'] = User.objects.filter(id__in=to_remove)
+            instance.save()
         instance.refresh_from_db()
         return instance
 
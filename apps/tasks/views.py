@@ -17,7 +17,8 @@ from core.permissions import (
     CanManageTask,
     ReadOnly
 )
-from apps.notifications.utils import send_real_time_notification
+from core.pagination import OptInCursorPagination
+from apps.notifications.utils import send_bulk_notifications, send_real_time_notification
 # Django imports
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
@@ -33,7 +34,6 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, ListAPIView
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.throttling import UserRateThrottle
 # Utility for standardized responses
 def standardized_response(
@@ -76,6 +76,9 @@ class TaskListCreateView(ListCreateAPIView):
     search_fields = ['name', 'description']
     ordering_fields = ['due_date', 'status', 'created_at', 'total_assignees']
     ordering = ['-due_date']
+    pagination_class = OptInCursorPagination
+    # due_date is nullable, so the keyset uses the creation time
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """
@@ -610,6 +613,8 @@ class CommentListCreateView(ListCreateAPIView):
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
     search_fields = ['content', 'author__username']
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
     throttle_classes = [UserRateThrottle]
 
     def get_queryset(self):
@@ -676,20 +681,20 @@ class CommentListCreateView(ListCreateAPIView):
         request = self.request
         content_type = ContentType.objects.get_for_model(Comment)
 
-        for user in comment.mentioned_users.all():
-            self.send_mention_notification(user, comment, request, content_type)
+        self.send_mention_notification(
+            comment.mentioned_users.values_list('id', flat=True), comment, request, content_type
+        )
 
         if comment.parent and comment.parent.author != request.user:
             self.send_reply_notification(comment, request, content_type)
 
-        # Notify task assignees about the new comment
-        task_assignees = comment.task.assignments.exclude(user=request.user).select_related('user')
-        for assignment in task_assignees:
-            self.send_task_comment_notification(assignment.user, comment, request, content_type)
+        # Notify task assignees about the new comment, keyed on the task so comments on it coalesce
+        task_assignees = comment.task.assignments.exclude(user=request.user).values_list('user_id', flat=True)
+        self.send_task_comment_notification(task_assignees, comment, request, ContentType.objects.get_for_model(Task))
 
-    def send_mention_notification(self, user, comment, request, content_type):
-        send_real_time_notification(
-            user=user,
+    def send_mention_notification(self, users, comment, request, content_type):
+        send_bulk_notifications(
+            users,
             message={
                 "title": "You were mentioned in a comment",
                 "body": f"{request.user.username} mentioned you in a comment: '{comment.content[:50]}...'",
@@ -697,7 +702,8 @@ class CommentListCreateView(ListCreateAPIView):
             },
             notification_type="comment_mention",
             content_type=content_type.id,
-            object_id=comment.id
+            object_id=comment.id,
+            sender=request.user
         )
 
     def send_reply_notification(self, comment, request, content_type):
@@ -713,9 +719,9 @@ class CommentListCreateView(ListCreateAPIView):
             object_id=comment.parent.id
         )
 
-    def send_task_comment_notification(self, user, comment, request, content_type):
-        send_real_time_notification(
-            user=user,
+    def send_task_comment_notification(self, users, comment, request, content_type):
+        send_bulk_notifications(
+            users,
             message={
                 "title": "New Comment on Task",
                 "body": f"{request.user.username} commented on task '{comment.task.name}': '{comment.content[:50]}...'",
@@ -723,7 +729,8 @@ class CommentListCreateView(ListCreateAPIView):
             },
             notification_type="task_comment",
             content_type=content_type.id,
-            object_id=comment.id
+            object_id=comment.task_id,
+            sender=request.user
         )
 
 class CommentDetailView(RetrieveUpdateDestroyAPIView):
@@ -834,7 +841,8 @@ class CommentRepliesView(ListAPIView):
     Handles listing replies for a specific comment with pagination.
     """
     serializer_class = CommentListSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
     permission_classes = [IsAuthenticated, IsTaskAssignee | CanManageTask]
     def get_queryset(self):
         comment_id = self.kwargs['pk']
@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+
+class MiddlewareJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that reuses the (user, token) pair LastSeenMiddleware already
+    authenticated for this request, so the token is decoded and the user loaded once.
+    Requests the middleware could not authenticate go through the full check, which
+    raises the usual authentication errors.
+    """
+    def authenticate(self, request):
+        auth_result = getattr(request._request, 'jwt_auth', None)
+        if auth_result is not None:
+            return auth_result
+        return super().authenticate(request)
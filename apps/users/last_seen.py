@@ -0,0 +1,55 @@
+"""
+Last seen timestamps buffered in Redis and flushed to the database in bulk.
+
+LastSeenMiddleware writes the user's timestamp and adds the user id to the set of
+active users. core.tasks.update_last_seen pops that set atomically and writes the
+timestamps of those users only, so a flush costs the same however many users exist.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django_redis import get_redis_connection
+
+User = get_user_model()
+
+LAST_SEEN_KEY = 'project_planner:last_seen:{}'
+ACTIVE_USERS_KEY = 'project_planner:last_seen:active'
+LAST_SEEN_TTL = 60 * 60  # 1 hour
+FLUSH_CHUNK_SIZE = 1000
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def touch(user_id, when):
+    """Buffer the last seen time of a user and mark the user as active, in one round trip."""
+    pipe = _redis().pipeline(transaction=False)
+    pipe.set(LAST_SEEN_KEY.format(user_id), when.timestamp(), ex=LAST_SEEN_TTL)
+    pipe.sadd(ACTIVE_USERS_KEY, user_id)
+    pipe.execute()
+
+
+def flush(chunk_size=FLUSH_CHUNK_SIZE):
+    """
+    Write the buffered timestamps of the users active since the last flush.
+    The active set is read and cleared in one MULTI/EXEC, so users seen while the
+    flush runs are kept for the next one. Returns the number of users updated.
+    """
+    pipe = _redis().pipeline(transaction=True)
+    pipe.smembers(ACTIVE_USERS_KEY)
+    pipe.delete(ACTIVE_USERS_KEY)
+    user_ids = sorted(int(user_id) for user_id in pipe.execute()[0])
+
+    updated = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        values = _redis().mget([LAST_SEEN_KEY.format(user_id) for user_id in chunk])
+        users = [
+            User(id=user_id, last_seen=datetime.fromtimestamp(float(value), tz=dt_timezone.utc))
+            for user_id, value in zip(chunk, values)
+            if value is not None
+        ]
+        User.objects.bulk_update(users, ['last_seen'])
+        updated += len(users)
+    return updated
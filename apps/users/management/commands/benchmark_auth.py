@@ -0,0 +1,118 @@
+import json
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_redis import get_redis_connection
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.authentication import MiddlewareJWTAuthentication
+from apps.users.middleware import LastSeenMiddleware
+
+User = get_user_model()
+
+
+class LegacyLastSeenMiddleware:
+    # The former middleware: full JWT authentication plus a cache read on every request
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.jwt_authentication = JWTAuthentication()
+
+    def __call__(self, request):
+        auth_result = self.jwt_authentication.authenticate(request)
+        if auth_result:
+            user, token = auth_result
+            request.user = user
+            cache_key = f'user_last_seen_{user.id}'
+            last_seen = cache.get(cache_key)
+            if not last_seen or (timezone.now() - last_seen) > timedelta(minutes=5):
+                cache.set(cache_key, timezone.now(), 60 * 60)
+        return self.get_response(request)
+
+
+class LegacyView(APIView):
+    authentication_classes = [JWTAuthentication]
+    throttle_classes = []  # Only authentication is measured
+
+    def get(self, request):
+        return Response({})
+
+
+class SharedAuthView(APIView):
+    authentication_classes = [MiddlewareJWTAuthentication]
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({})
+
+
+def redis_calls():
+    # Total commands processed by the server, including the INFO call itself
+    stats = get_redis_connection('default').info('commandstats')
+    return sum(stat['calls'] for stat in stats.values())
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the database queries, Redis calls and time per authenticated API request "
+        "between authenticating in both LastSeenMiddleware and DRF, and authenticating once "
+        "in the middleware with MiddlewareJWTAuthentication reusing the result."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Number of requests per variant.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_active=True).first()
+        if user is None:
+            raise CommandError("At least one active user is needed to sign the token.")
+        token = str(AccessToken.for_user(user))
+        count = options['requests']
+
+        results = {
+            'requests': count,
+            'double_authentication': self.measure(LegacyLastSeenMiddleware(LegacyView.as_view()), token, count),
+            'shared_authentication': self.measure(LastSeenMiddleware(SharedAuthView.as_view()), token, count),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"Requests per variant: {count}")
+        for name in ('double_authentication', 'shared_authentication'):
+            result = results[name]
+            self.stdout.write(
+                f"{name:>22}: {result['queries_per_request']:.2f} queries/request, "
+                f"{result['redis_calls_per_request']:.2f} Redis calls/request, "
+                f"{result['ms_per_request']:.3f} ms/request"
+            )
+
+    def measure(self, handler, token, count):
+        factory = RequestFactory()
+        requests = [factory.get('/', HTTP_AUTHORIZATION=f'Bearer {token}') for _ in range(count)]
+
+        redis_before = redis_calls()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for request in requests:
+                response = handler(request)
+                if response.status_code != 200:
+                    raise CommandError(f"Request failed with status {response.status_code}.")
+            elapsed = time.perf_counter() - started
+        redis_used = redis_calls() - redis_before - 1
+
+        return {
+            'queries_per_request': len(queries.captured_queries) / count,
+            'redis_calls_per_request': redis_used / count,
+            'ms_per_request': elapsed * 1000 / count,
+        }
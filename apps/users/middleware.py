@@ -1,16 +1,28 @@
 import logging
+import time
 from django.utils import timezone
-from django.core.cache import cache
-from datetime import timedelta
+
+from apps.users.last_seen import touch
 
 logger = logging.getLogger('project_planner')
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+LAST_SEEN_INTERVAL = 5 * 60  # seconds between last seen writes of a user
+LAST_SEEN_MAX_TRACKED = 100000  # users tracked per process before the map is reset
+
+
 class LastSeenMiddleware:
+    """
+    Authenticates the JWT of the request once and records the user's last seen time.
+    The (user, token) pair is stored as request.jwt_auth for MiddlewareJWTAuthentication.
+    Writes are throttled in-process to one per user every LAST_SEEN_INTERVAL seconds,
+    so most requests make no Redis call at all.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
         self.jwt_authentication = JWTAuthentication()
+        self.last_written = {}  # user id -> monotonic time of the last write from this process
 
     def __call__(self, request):
         try:
@@ -18,14 +30,20 @@ class LastSeenMiddleware:
             if auth_result:
                 user, token = auth_result
                 request.user = user
-                
-                cache_key = f'user_last_seen_{user.id}'
-                last_seen = cache.get(cache_key)
-
-                if not last_seen or (timezone.now() - last_seen) > timedelta(minutes=5):
-                    cache.set(cache_key, timezone.now(), 60 * 60)
+                request.jwt_auth = auth_result
+                self.record_last_seen(user.id)
         except Exception as e:
             logger.debug(f"JWT Authentication error: {str(e)}")
 
         response = self.get_response(request)
         return response
+
+    def record_last_seen(self, user_id):
+        current_time = time.monotonic()
+        last_written = self.last_written.get(user_id)
+        if last_written is not None and current_time - last_written < LAST_SEEN_INTERVAL:
+            return
+        if len(self.last_written) >= LAST_SEEN_MAX_TRACKED:
+            self.last_written.clear()
+        self.last_written[user_id] = current_time
+        touch(user_id, timezone.now())
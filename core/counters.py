@@ -0,0 +1,461 @@
+"""
+Incremental counter engine for the denormalized counts on projects, memberships,
+tasks and profiles.
+
+Instead of recounting whole tables, every change is translated into F()-based
+deltas applied to the affected rows only. The database performs the arithmetic,
+so concurrent writers never overwrite each other's increments.
+
+With COUNTER_UPDATE_MODE = 'deferred' the handlers only mark the affected rows
+dirty in Redis, and core.tasks.flush_dirty_counters recomputes them periodically
+with one grouped aggregate query per table. Inside a
+core.side_effects.deferred_side_effects() block the rows are collected in memory
+and recomputed once when the block's transaction commits.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django_redis import get_redis_connection
+from apps.projects.models import Project, ProjectMembership
+from apps.tasks.models import Comment, Task, TaskAssignment
+from apps.users.models import Profile
+from core import side_effects
+from project_planner.logging import ERROR, project_logger
+
+# Fields whose change affects task related counters
+TASK_COUNTER_FIELDS = {'project', 'project_id', 'status'}
+PROJECT_COUNTER_FIELDS = {'owner', 'owner_id'}
+
+# Redis sets holding rows whose counters must be recomputed (deferred mode)
+DIRTY_PROJECTS_KEY = 'project_planner:counters:dirty:projects'
+DIRTY_MEMBERSHIPS_KEY = 'project_planner:counters:dirty:memberships'  # "<project_id>:<user_id>"
+DIRTY_TASKS_KEY = 'project_planner:counters:dirty:tasks'
+DIRTY_PROFILES_KEY = 'project_planner:counters:dirty:profiles'
+
+
+def is_deferred():
+    """Check whether counters are recomputed in batches instead of inline."""
+    return (
+        side_effects.current_collector() is not None
+        or getattr(settings, 'COUNTER_UPDATE_MODE', 'immediate') == 'deferred'
+    )
+
+
+def mark_dirty(projects=(), memberships=(), tasks=(), profiles=()):
+    """
+    Record rows whose counters must be recomputed. Inside a deferred_side_effects()
+    block they are collected in memory, otherwise they are added to the Redis dirty
+    sets in a single pipeline once the transaction commits, so a flush never
+    recounts them before the change is visible.
+    Returns True, the rows are recounted inline at commit if Redis is unavailable.
+    """
+    collector = side_effects.current_collector()
+    if collector is not None:
+        collector.mark(projects=projects, memberships=memberships, tasks=tasks, profiles=profiles)
+        return True
+
+    marked = {
+        'projects': list(projects), 'memberships': list(memberships),
+        'tasks': list(tasks), 'profiles': list(profiles),
+    }
+    transaction.on_commit(lambda: _add_dirty(**marked))
+    return True
+
+
+def _add_dirty(projects, memberships, tasks, profiles):
+    entries = (
+        (DIRTY_PROJECTS_KEY, [str(pk) for pk in projects]),
+        (DIRTY_MEMBERSHIPS_KEY, [f"{project_id}:{user_id}" for project_id, user_id in memberships]),
+        (DIRTY_TASKS_KEY, [str(pk) for pk in tasks]),
+        (DIRTY_PROFILES_KEY, [str(pk) for pk in profiles]),
+    )
+    try:
+        _add_members(entries)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to mark counters dirty, recounting inline: {str(e)}")
+        recount_marked(projects=projects, memberships=memberships, tasks=tasks, profiles=profiles)
+
+
+def _add_members(entries):
+    pipe = get_redis_connection('default').pipeline(transaction=False)
+    for key, members in entries:
+        if members:
+            pipe.sadd(key, *members)
+    pipe.execute()
+
+
+def apply_deltas(queryset, **deltas):
+    """
+    Apply F()-based deltas to every row of the queryset in a single UPDATE.
+    Negative deltas are clamped at zero so counters never underflow.
+    """
+    updates = {
+        field: Greatest(F(field) + delta, Value(0)) if delta < 0 else F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if updates:
+        queryset.update(**updates)
+
+
+def _locked(queryset):
+    """Lock the selected rows when running inside a transaction."""
+    if transaction.get_connection().in_atomic_block:
+        return queryset.select_for_update()
+    return queryset
+
+
+def _claim_state(queryset, new_state):
+    """
+    Read the persisted values of the new_state fields and write the new values with a
+    conditional UPDATE on the values read. Of two concurrent saves making the same
+    change only one sees the old values, also on databases that ignore
+    select_for_update. Returns the old values, or None if the row is gone.
+    """
+    while True:
+        old_state = _locked(queryset).values(*new_state).first()
+        if old_state is None or queryset.filter(**old_state).update(**new_state):
+            return old_state
+
+
+def _memberships(project_id, user_ids):
+    return ProjectMembership.objects.filter(project_id=project_id, user_id__in=user_ids)
+
+
+def _tracks(update_fields, fields):
+    """Check whether a save with the given update_fields can touch the counter fields."""
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+# ========== #
+# Task rows  #
+# ========== #
+
+def capture_task_state(task, update_fields=None):
+    """
+    Remember the persisted project and status of a task before it is saved,
+    so the post-save handler can compute deltas from the old and new state.
+    Task.save() runs in a transaction, so the claim and the deltas commit together.
+    """
+    task._counter_state = None
+    if task.pk is None or not _tracks(update_fields, TASK_COUNTER_FIELDS):
+        return
+    task._counter_state = _claim_state(
+        Task.objects.filter(pk=task.pk), {'project_id': task.project_id, 'status': task.status}
+    )
+
+
+def task_saved(task, created):
+    """
+    Apply counter deltas for a created or updated task.
+    """
+    if created:
+        if not (is_deferred() and mark_dirty(projects=[task.project_id])):
+            apply_deltas(Project.objects.filter(pk=task.project_id), total_tasks=1)
+        return
+
+    old_state = getattr(task, '_counter_state', None)
+    if old_state is None:
+        return
+
+    old_project_id = old_state['project_id']
+    was_completed = old_state['status'] == 'completed'
+    is_completed = task.status == 'completed'
+    if old_project_id == task.project_id and was_completed == is_completed:
+        return
+
+    user_ids = list(TaskAssignment.objects.filter(task_id=task.pk).values_list('user_id', flat=True))
+
+    if is_deferred():
+        project_ids = {old_project_id, task.project_id}
+        if mark_dirty(
+            projects=project_ids,
+            memberships=[(project_id, user_id) for project_id in project_ids for user_id in user_ids]
+        ):
+            return
+
+    if old_project_id != task.project_id:
+        # Task moved between projects
+        apply_deltas(Project.objects.filter(pk=old_project_id), total_tasks=-1)
+        apply_deltas(Project.objects.filter(pk=task.project_id), total_tasks=1)
+        if user_ids:
+            apply_deltas(
+                _memberships(old_project_id, user_ids),
+                total_tasks=-1, completed_tasks=-int(was_completed)
+            )
+            apply_deltas(
+                _memberships(task.project_id, user_ids),
+                total_tasks=1, completed_tasks=int(is_completed)
+            )
+    elif user_ids:
+        # Task moved into or out of the completed state
+        apply_deltas(
+            _memberships(task.project_id, user_ids),
+            completed_tasks=1 if is_completed else -1
+        )
+
+
+def task_deleted(task):
+    """
+    Apply counter deltas for a deleted task.
+    Membership counters are handled by the cascading assignment deletes.
+    """
+    if is_deferred() and mark_dirty(projects=[task.project_id]):
+        return
+    apply_deltas(Project.objects.filter(pk=task.project_id), total_tasks=-1)
+
+
+# ================ #
+# Task assignments #
+# ================ #
+
+def assignments_changed(task_id, user_ids, sign):
+    """
+    Apply counter deltas for users assigned to (sign=1) or unassigned from
+    (sign=-1) a task. Use this directly after bulk_create or queryset deletes,
+    which do not send per-row signals.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    state = Task.objects.filter(pk=task_id).values('project_id', 'status').first()
+    if state is None:
+        return
+    if is_deferred() and mark_dirty(
+        tasks=[task_id],
+        memberships=[(state['project_id'], user_id) for user_id in user_ids]
+    ):
+        return
+
+    apply_deltas(Task.objects.filter(pk=task_id), total_assignees=sign * len(user_ids))
+    apply_deltas(
+        _memberships(state['project_id'], user_ids),
+        total_tasks=sign,
+        completed_tasks=sign if state['status'] == 'completed' else 0
+    )
+
+
+# ================== #
+# Projects & members #
+# ================== #
+
+def capture_project_state(project, update_fields=None):
+    """
+    Remember the persisted owner of a project before it is saved.
+    """
+    project._counter_state = None
+    if project.pk is None or not _tracks(update_fields, PROJECT_COUNTER_FIELDS):
+        return
+    project._counter_state = _claim_state(Project.objects.filter(pk=project.pk), {'owner_id': project.owner_id})
+
+
+def project_saved(project, created):
+    """
+    Apply owned project deltas to the profiles of the old and new owner.
+    """
+    if created:
+        if not (is_deferred() and mark_dirty(profiles=[project.owner_id])):
+            apply_deltas(Profile.objects.filter(user_id=project.owner_id), owned_projects_count=1)
+        return
+
+    old_state = getattr(project, '_counter_state', None)
+    if old_state is None or old_state['owner_id'] == project.owner_id:
+        return
+    if is_deferred() and mark_dirty(profiles=[old_state['owner_id'], project.owner_id]):
+        return
+    apply_deltas(Profile.objects.filter(user_id=old_state['owner_id']), owned_projects_count=-1)
+    apply_deltas(Profile.objects.filter(user_id=project.owner_id), owned_projects_count=1)
+
+
+def project_deleted(project):
+    if is_deferred() and mark_dirty(profiles=[project.owner_id]):
+        return
+    apply_deltas(Profile.objects.filter(user_id=project.owner_id), owned_projects_count=-1)
+
+
+def memberships_changed(user_ids, sign):
+    """
+    Apply participated project deltas for users joining (sign=1) or
+    leaving (sign=-1) a project.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    if is_deferred() and mark_dirty(profiles=user_ids):
+        return
+    apply_deltas(Profile.objects.filter(user_id__in=user_ids), participated_projects_count=sign)
+
+
+# ============================ #
+# Grouped aggregate recounting #
+# ============================ #
+# Each recount runs one GROUP BY query per table, compares the result with the
+# stored values and writes only the rows that drifted with bulk_update.
+# They return the list of corrected instances.
+
+def _write_changed(model, rows, expected, fields, dry_run=False):
+    changed = []
+    for row in rows:
+        values = expected(row)
+        if any(getattr(row, field) != values[field] for field in fields):
+            for field in fields:
+                setattr(row, field, values[field])
+            changed.append(row)
+    if changed and not dry_run:
+        model.objects.bulk_update(changed, fields, batch_size=500)
+    return changed
+
+
+def recount_projects(queryset, dry_run=False):
+    """Recompute Project.total_tasks and total_member_count for the projects in the queryset."""
+    projects = list(queryset.only('id', 'total_tasks', 'total_member_count'))
+    project_ids = [p.id for p in projects]
+    tasks = dict(
+        Task.objects.filter(project_id__in=project_ids)
+        .values('project_id').annotate(total=Count('id')).values_list('project_id', 'total')
+    )
+    members = dict(
+        ProjectMembership.objects.filter(project_id__in=project_ids)
+        .values('project_id').annotate(total=Count('id')).values_list('project_id', 'total')
+    )
+
+    def expected(project):
+        return {
+            'total_tasks': tasks.get(project.id, 0),
+            'total_member_count': members.get(project.id, 0),
+        }
+
+    return _write_changed(Project, projects, expected, ['total_tasks', 'total_member_count'], dry_run)
+
+
+def recount_tasks(queryset, dry_run=False):
+    """Recompute Task.total_assignees for the tasks in the queryset."""
+    tasks = list(queryset.only('id', 'total_assignees'))
+    counts = dict(
+        TaskAssignment.objects.filter(task_id__in=[t.id for t in tasks])
+        .values('task_id').annotate(total=Count('id')).values_list('task_id', 'total')
+    )
+    return _write_changed(
+        Task, tasks, lambda t: {'total_assignees': counts.get(t.id, 0)}, ['total_assignees'], dry_run
+    )
+
+
+def recount_memberships(queryset, dry_run=False):
+    """Recompute ProjectMembership.total_tasks and completed_tasks for the memberships in the queryset."""
+    memberships = list(queryset.only('id', 'project_id', 'user_id', 'total_tasks', 'completed_tasks'))
+    counts = {
+        (row['task__project_id'], row['user_id']): row
+        for row in TaskAssignment.objects.filter(
+            task__project_id__in={m.project_id for m in memberships},
+            user_id__in={m.user_id for m in memberships},
+        ).values('task__project_id', 'user_id').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(task__status='completed')),
+        )
+    }
+
+    def expected(membership):
+        row = counts.get((membership.project_id, membership.user_id), {})
+        return {'total_tasks': row.get('total', 0), 'completed_tasks': row.get('completed', 0)}
+
+    return _write_changed(
+        ProjectMembership, memberships, expected, ['total_tasks', 'completed_tasks'], dry_run
+    )
+
+
+def recount_profiles(queryset, dry_run=False):
+    """Recompute owned and participated project counts for the profiles in the queryset."""
+    profiles = list(queryset.only('id', 'user_id', 'owned_projects_count', 'participated_projects_count'))
+    user_ids = [p.user_id for p in profiles]
+    owned = dict(
+        Project.objects.filter(owner_id__in=user_ids)
+        .values('owner_id').annotate(total=Count('id')).values_list('owner_id', 'total')
+    )
+    participated = dict(
+        ProjectMembership.objects.filter(user_id__in=user_ids)
+        .values('user_id').annotate(total=Count('id')).values_list('user_id', 'total')
+    )
+
+    def expected(profile):
+        return {
+            'owned_projects_count': owned.get(profile.user_id, 0),
+            'participated_projects_count': participated.get(profile.user_id, 0),
+        }
+
+    return _write_changed(
+        Profile, profiles, expected, ['owned_projects_count', 'participated_projects_count'], dry_run
+    )
+
+
+def recount_comments(queryset, dry_run=False):
+    """Recompute Comment.reply_count and mention_count for the comments in the queryset."""
+    comments = list(queryset.only('id', 'reply_count', 'mention_count'))
+    comment_ids = [c.id for c in comments]
+    replies = dict(
+        Comment.objects.filter(parent_id__in=comment_ids)
+        .values('parent_id').annotate(total=Count('id')).values_list('parent_id', 'total')
+    )
+    mentions = dict(
+        Comment.mentioned_users.through.objects.filter(comment_id__in=comment_ids)
+        .values('comment_id').annotate(total=Count('id')).values_list('comment_id', 'total')
+    )
+
+    def expected(comment):
+        return {
+            'reply_count': replies.get(comment.id, 0),
+            'mention_count': mentions.get(comment.id, 0),
+        }
+
+    return _write_changed(Comment, comments, expected, ['reply_count', 'mention_count'], dry_run)
+
+
+def _pop_all(pipe, key):
+    pipe.smembers(key)
+    pipe.delete(key)
+
+
+def recount_marked(projects=(), memberships=(), tasks=(), profiles=()):
+    """
+    Recompute the counters of the given rows with one grouped query per table.
+    Returns the number of rows that were corrected per table.
+    """
+    projects, tasks, profiles = set(projects), set(tasks), set(profiles)
+    memberships = set(memberships)
+    # Recounting the cross product of the marked projects and users is a superset
+    # of the marked pairs, but keeps the lookup to a single indexed query.
+    membership_filter = Q(
+        project_id__in={project_id for project_id, _ in memberships},
+        user_id__in={user_id for _, user_id in memberships},
+    )
+    return {
+        'projects': len(recount_projects(Project.objects.filter(pk__in=projects))) if projects else 0,
+        'memberships': len(recount_memberships(ProjectMembership.objects.filter(membership_filter)))
+        if memberships else 0,
+        'tasks': len(recount_tasks(Task.objects.filter(pk__in=tasks))) if tasks else 0,
+        'profiles': len(recount_profiles(Profile.objects.filter(user_id__in=profiles))) if profiles else 0,
+    }
+
+
+def flush_dirty():
+    """
+    Atomically drain the Redis dirty sets and recompute the marked rows.
+    If the recount fails the drained rows are marked again for the next flush.
+    Returns the number of rows that were corrected per table.
+    """
+    keys = (DIRTY_PROJECTS_KEY, DIRTY_MEMBERSHIPS_KEY, DIRTY_TASKS_KEY, DIRTY_PROFILES_KEY)
+    pipe = get_redis_connection('default').pipeline(transaction=True)
+    for key in keys:
+        _pop_all(pipe, key)
+    projects, _, memberships, _, tasks, _, profiles, _ = pipe.execute()
+
+    try:
+        return recount_marked(
+            projects=[int(pk) for pk in projects],
+            memberships=[tuple(int(pk) for pk in member.decode().split(':')) for member in memberships],
+            tasks=[int(pk) for pk in tasks],
+            profiles=[int(pk) for pk in profiles],
+        )
+    except Exception:
+        _add_members(zip(keys, (projects, memberships, tasks, profiles)))
+        raise
@@ -0,0 +1,65 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a fixed, unique ordering such as ('-created_at', '-id').
+    Pages are fetched with an indexed range filter instead of OFFSET and no total
+    count is computed, so page time stays flat at any depth.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_ordering(self, request, queryset, view):
+        # The keyset must stay unique, so user supplied ordering is ignored here
+        return self.ordering
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination when the request
+    passes ?pagination=cursor or a cursor returned by a previous page.
+    Views set `cursor_ordering` to the keyset, which needs a matching composite index.
+    Views without a `cursor_ordering` always use page numbers.
+    """
+    cursor_query_param = 'cursor'
+    keyset = None
+
+    def is_cursor_request(self, request):
+        return (
+            request.query_params.get('pagination') == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if getattr(view, 'cursor_ordering', None) and self.is_cursor_request(request):
+            self.keyset = KeysetPagination(view.cursor_ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': 'pagination',
+                'required': False,
+                'in': 'query',
+                'description': "Set to 'cursor' to use cursor pagination (no total count).",
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+        ]
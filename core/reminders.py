@@ -0,0 +1,130 @@
+"""
+Time-indexed schedule of due date reminders kept in a Redis sorted set.
+
+Every open task and project with a due date has two entries, scored with the
+Unix time they become actionable:
+    due_soon:<model>:<id>  REMINDER_LEAD_TIME before the due date
+    overdue:<model>:<id>   at the due date
+Entries are written when the object is saved and removed when it is deleted or
+closed. core.tasks.process_due_reminders pops only the entries whose time has
+come, so its cost follows the number of due items instead of the table size.
+Popped entries are re-checked against the database, so stale entries are harmless,
+and are put back when processing them fails.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+from django_redis import get_redis_connection
+from project_planner.logging import ERROR, project_logger
+
+SCHEDULE_KEY = 'project_planner:reminders:schedule'
+REMINDER_LEAD_TIME = timedelta(hours=24)
+OPEN_STATUSES = ["not_started", "in_progress"]
+REMINDER_KINDS = ('due_soon', 'overdue')
+
+# Pop up to ARGV[2] entries scored at or before ARGV[1] in one step, so concurrent
+# workers never process the same entry.
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _members(instance):
+    model_name = instance._meta.model_name
+    return [f'{kind}:{model_name}:{instance.pk}' for kind in REMINDER_KINDS]
+
+
+def _is_open(instance):
+    return instance.due_date is not None and instance.status in OPEN_STATUSES
+
+
+def _entries(instance):
+    due_soon, overdue = _members(instance)
+    return {
+        due_soon: (instance.due_date - REMINDER_LEAD_TIME).timestamp(),
+        overdue: instance.due_date.timestamp(),
+    }
+
+
+def _apply(add, remove):
+    try:
+        if add:
+            _redis().zadd(SCHEDULE_KEY, add)
+        if remove:
+            _redis().zrem(SCHEDULE_KEY, *remove)
+    except Exception as e:
+        project_logger.log(ERROR, f"Failed to update the reminder schedule: {str(e)}")
+
+
+def schedule(instance):
+    """
+    Write the reminder entries of an open task or project when the transaction
+    commits, or clear them once it is closed or has no due date.
+    The entries are computed from the saved state, not the state at commit time.
+    """
+    if _is_open(instance):
+        add, remove = _entries(instance), []
+    else:
+        add, remove = {}, _members(instance)
+    transaction.on_commit(lambda: _apply(add, remove))
+
+
+def unschedule(instance):
+    """
+    Remove the reminder entries of a deleted task or project when the transaction commits.
+    """
+    # Captured now, the instance loses its pk once the delete completes
+    remove = _members(instance)
+    transaction.on_commit(lambda: _apply({}, remove))
+
+
+def pop_due(limit):
+    """
+    Pop up to limit entries that are due now.
+    Returns {(kind, model_name): [object ids]}.
+    """
+    due = {}
+    for member in _redis().eval(POP_DUE_SCRIPT, 1, SCHEDULE_KEY, now().timestamp(), limit):
+        kind, model_name, pk = member.decode().split(':')
+        due.setdefault((kind, model_name), []).append(int(pk))
+    return due
+
+
+def restore(due):
+    """
+    Put entries returned by pop_due back as due now, e.g. when processing them failed,
+    so the next poll retries them. Entries rescheduled in the meantime are kept.
+    """
+    current_time = now().timestamp()
+    entries = {
+        f'{kind}:{model_name}:{pk}': current_time
+        for (kind, model_name), ids in due.items() for pk in ids
+    }
+    if entries:
+        _redis().zadd(SCHEDULE_KEY, entries, nx=True)
+
+
+def rebuild(models, chunk_size=2000):
+    """
+    Re-add the entries of every open object with a due date, e.g. after a Redis flush.
+    Existing entries are only overwritten, never removed.
+    """
+    for model in models:
+        objects = model.objects.filter(
+            due_date__isnull=False, status__in=OPEN_STATUSES
+        ).only('id', 'due_date', 'status')
+        pipe = _redis().pipeline(transaction=False)
+        for index, instance in enumerate(objects.iterator(chunk_size=chunk_size), start=1):
+            pipe.zadd(SCHEDULE_KEY, _entries(instance))
+            if index % chunk_size == 0:
+                pipe.execute()
+        pipe.execute()
@@ -1,10 +1,51 @@
-from core.tasks import send_email
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.html import escape, strip_tags
+from core.tasks import send_email, send_email_batch
+
+# Rendered in place of a per-recipient field, then replaced with each recipient's value
+RECIPIENT_FIELD = '__recipient_{}__'
+
+
+def render_email(template_name, context):
+    """
+    Render the HTML and plain text bodies of templates/emails/<template_name>.html and .txt.
+    The cached template loader compiles each template once per process.
+    """
+    return (
+        get_template(f'emails/{template_name}.html').render(context),
+        get_template(f'emails/{template_name}.txt').render(context),
+    )
+
+
+def render_emails(template_name, context, recipients):
+    """
+    Render one email per recipient while rendering the templates only once.
+    Args:
+        template_name (str): Name of the template under templates/emails/.
+        context (dict): Fields shared by every recipient.
+        recipients (iterable): (email, fields) pairs. Every recipient has the same field names,
+            and the values are inserted as they are, so format them before.
+    Yields (email, html, text) tuples.
+    """
+    html = text = None
+    for email, fields in recipients:
+        if html is None:
+            html, text = render_email(
+                template_name, {**context, **{name: RECIPIENT_FIELD.format(name) for name in fields}}
+            )
+        recipient_html, recipient_text = html, text
+        for name, value in fields.items():
+            recipient_html = recipient_html.replace(RECIPIENT_FIELD.format(name), escape(value))
+            recipient_text = recipient_text.replace(RECIPIENT_FIELD.format(name), str(value))
+        yield email, recipient_html, recipient_text
+
 
 class EmailService:
     """
     Service to handle email-related operations, such as sending OTP and other custom emails.
     """
-    
+
     def send_otp_email(self, otp, email):
         """
         Send OTP code to the user's email with a formatted message.
@@ -12,24 +53,8 @@ class EmailService:
             otp (str): The OTP code to send.
             email (str): The recipient's email address.
         """
-        subject = "Your OTP Code"
-        message = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <h2 style="color: #4CAF50;">Your OTP Code</h2>
-            <p>Dear User,</p>
-            <p>We received a request to verify your email address. Use the OTP code below to complete the process:</p>
-            <p style="font-size: 1.5em; font-weight: bold; color: #4CAF50;">{otp}</p>
-            <p>If you did not request this, please ignore this email.</p>
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-            <footer style="font-size: 0.9em; color: #777;">
-                <p>Thank you for choosing our service!</p>
-                <p>&copy; {2025} Project Planner. All rights reserved.</p>
-            </footer>
-        </body>
-        </html>
-        """
-        send_email.delay(subject, message, email, content_type="text/html")
+        html, text = render_email('otp', {'otp': otp})
+        send_email.delay("Your OTP Code", html, email, content_type="text/html", text_message=text)
 
     def send_custom_email(self, subject, message_body, email):
         """
@@ -39,16 +64,48 @@ class EmailService:
             message_body (str): The HTML content of the email.
             email (str): The recipient's email address.
         """
-        message = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            {message_body}
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-            <footer style="font-size: 0.9em; color: #777;">
-                <p>Thank you for choosing our service!</p>
-                <p>&copy; {2025} Project Planner. All rights reserved.</p>
-            </footer>
-        </body>
-        </html>
-        """
-        send_email.delay(subject, message, email, content_type="text/html")
+        html, text = render_email('custom', {'message_body': message_body, 'message_text': strip_tags(message_body)})
+        send_email.delay(subject, html, email, content_type="text/html", text_message=text)
+
+    def send_template_emails(self, subject, template_name, context, recipients):
+        """
+        Send the same templated email to many recipients in batches.
+        The template is rendered once and only the per-recipient fields differ.
+        Args:
+            subject (str): The subject of the email.
+            template_name (str): Name of the template under templates/emails/.
+            context (dict): Fields shared by every recipient.
+            recipients (iterable): (email, fields) pairs, see render_emails.
+        """
+        return self.send_in_batches(
+            ((subject, html, email, text) for email, html, text in render_emails(template_name, context, recipients)),
+            content_type="text/html"
+        )
+
+    def send_bulk_email(self, subject, message, emails, content_type="text/plain"):
+        """
+        Send the same email to many recipients in batches.
+        Args:
+            subject (str): The subject of the email.
+            message (str): The content of the email.
+            emails (iterable): The recipients' email addresses.
+        """
+        return self.send_in_batches(((subject, message, email) for email in emails), content_type=content_type)
+
+    def send_in_batches(self, messages, content_type):
+        """
+        Queue (subject, message, email[, text_message]) tuples as send_email_batch tasks
+        of EMAIL_BATCH_SIZE messages. Returns the number of queued batches.
+        """
+        batches = 0
+        batch = []
+        for message in messages:
+            batch.append(list(message))
+            if len(batch) == settings.EMAIL_BATCH_SIZE:
+                send_email_batch.delay(batch, content_type=content_type)
+                batches += 1
+                batch = []
+        if batch:
+            send_email_batch.delay(batch, content_type=content_type)
+            batches += 1
+        return batches
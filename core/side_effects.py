@@ -0,0 +1,98 @@
+"""
+Deferral of per-row side effects for bulk write paths.
+
+Inside a deferred_side_effects() block the counter handlers only record which
+parent rows were touched and the notification senders only queue their
+arguments. When the block exits, the touched counters are recomputed once with
+grouped queries and the queued notifications are dispatched in one batch, after
+the surrounding transaction commits.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from project_planner.logging import ERROR, project_logger
+
+_collector = ContextVar('side_effect_collector', default=None)
+
+
+class SideEffectCollector:
+    """
+    Collects the parents touched and the notifications queued inside a block.
+    """
+    def __init__(self):
+        self.projects = set()
+        self.memberships = set()  # (project_id, user_id) pairs
+        self.tasks = set()
+        self.profiles = set()
+        self.notifications = {}  # payload -> send_bulk_notifications() arguments
+
+    def mark(self, projects=(), memberships=(), tasks=(), profiles=()):
+        self.projects.update(projects)
+        self.memberships.update(memberships)
+        self.tasks.update(tasks)
+        self.profiles.update(profiles)
+
+    def queue_notification(self, recipients, message, notification_type, content_type=None,
+                           object_id=None, sender=None):
+        """
+        Queue a notification, merging it with a queued one carrying the same payload.
+        """
+        key = (
+            message['title'], message['body'], message.get('url'),
+            notification_type, content_type, object_id, getattr(sender, 'pk', sender)
+        )
+        if key not in self.notifications:
+            self.notifications[key] = {
+                'recipients': [], 'message': message, 'notification_type': notification_type,
+                'content_type': content_type, 'object_id': object_id, 'sender': sender,
+            }
+        self.notifications[key]['recipients'].extend(recipients)
+
+    def flush(self):
+        """
+        Run one batched counter recompute and one batched notification dispatch.
+        """
+        from core import counters
+        from apps.notifications.utils import send_bulk_notifications
+
+        counters.recount_marked(
+            projects=self.projects, memberships=self.memberships,
+            tasks=self.tasks, profiles=self.profiles
+        )
+        for kwargs in self.notifications.values():
+            try:
+                send_bulk_notifications(**kwargs)
+            except Exception as e:
+                project_logger.log(ERROR, f"Failed to dispatch deferred notifications: {str(e)}")
+
+
+def current_collector():
+    """Return the collector of the active deferred_side_effects() block, if any."""
+    return _collector.get()
+
+
+@contextmanager
+def deferred_side_effects():
+    """
+    Suspend per-row counter updates and notification sends for the duration of
+    the block, then apply them in one batch on transaction commit.
+
+    Nested blocks join the outermost one. If the block raises, queued
+    notifications are dropped while the counter recompute is still scheduled,
+    because rows written outside a transaction are not rolled back.
+    """
+    collector = _collector.get()
+    if collector is not None:
+        yield collector
+        return
+
+    collector = SideEffectCollector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    except Exception:
+        collector.notifications.clear()
+        raise
+    finally:
+        _collector.reset(token)
+        transaction.on_commit(collector.flush)
@@ -1,75 +1,138 @@
 # core/signals.py
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from apps.projects.models import ProjectMembership
+from apps.projects.models import Project, ProjectMembership
 from apps.tasks.models import Task, TaskAssignment
 from apps.notifications.models import NotificationPreference
+from apps.notifications.middleware import invalidate_user_summaries
+from apps.notifications.preferences import cache_preferences, invalidate_preferences
+from core import counters, reminders
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
-    
-    
+
+
 @receiver(post_save, sender=User)
 def create_notification_preferences(sender, instance, created, **kwargs):
     if created:
         NotificationPreference.objects.create(user=instance)
-        
-        
-# update user profile project count on membership creation
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_websocket_user_summary(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop the cached summary used by WebSocket handshakes whenever a user changes.
+    Activity timestamps are not part of the summary and are ignored.
+    """
+    if update_fields and set(update_fields) <= {'last_seen', 'last_login'}:
+        return
+    invalidate_user_summaries([instance.pk])
+
+
+@receiver(post_save, sender=NotificationPreference)
+def cache_notification_preferences(sender, instance, **kwargs):
+    """
+    Write the saved preferences to the bitmask cache used at fan-out time once committed.
+    """
+    user_id, preferences = instance.user_id, instance.preferences or {}
+    transaction.on_commit(lambda: cache_preferences(user_id, preferences))
+
+
+@receiver(post_delete, sender=NotificationPreference)
+def invalidate_notification_preferences(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_preferences([user_id]))
+
+
+# ================ #
+# Counter updates  #
+# ================ #
+# All denormalized counters are maintained with F()-based deltas computed from the
+# old and new state of the changed row. See core/counters.py.
+
+@receiver(pre_save, sender=Project)
+def capture_project_counter_state(sender, instance, update_fields=None, **kwargs):
+    counters.capture_project_state(instance, update_fields)
+
+
+@receiver(post_save, sender=Project)
+def update_profile_on_project_save(sender, instance, created, **kwargs):
+    """
+    Signal to update the owned project counts of the owner's profile
+    when a project is created or changes owner.
+    """
+    counters.project_saved(instance, created)
+
+
+@receiver(post_delete, sender=Project)
+def update_profile_on_project_delete(sender, instance, **kwargs):
+    counters.project_deleted(instance)
+
+
+# update user profile project count on membership creation and deletion
 @receiver(post_save, sender=ProjectMembership)
 def update_user_profile_project_count(sender, instance, created, **kwargs):
     if created:
-        instance.user.profile.participated_projects_count += 1
-        instance.user.profile.save()
-        
+        counters.memberships_changed([instance.user_id], 1)
+
+
+@receiver(post_delete, sender=ProjectMembership)
+def update_user_profile_project_count_on_delete(sender, instance, **kwargs):
+    counters.memberships_changed([instance.user_id], -1)
+
+
+@receiver(pre_save, sender=Task)
+def capture_task_counter_state(sender, instance, update_fields=None, **kwargs):
+    counters.capture_task_state(instance, update_fields)
+
+
 @receiver(post_save, sender=Task)
 def update_project_and_membership_on_task_save(sender, instance, created, **kwargs):
     """
-    Signal to update the total task counts and completed task counts for the project
-    and related memberships when a task is created or updated.
+    Signal to update the total task counts of the project and the task counts of the
+    assignees' memberships when a task is created, moved or its completion changes.
     """
-    project = instance.project
+    counters.task_saved(instance, created)
 
-    # Only update project total tasks if there was an actual change
-    if created or instance.project.total_tasks != project.tasks.count():
-        project.total_tasks = project.tasks.count()
-        project.save()
 
-    # Update total tasks and completed tasks for each membership in the project
-    memberships = ProjectMembership.objects.filter(project=project)
-
-    for membership in memberships:
-        # Update task counts only if necessary (e.g., if assignments exist or status changed)
-        membership.update_task_counts()
+@receiver(post_delete, sender=Task)
+def update_project_on_task_delete(sender, instance, **kwargs):
+    counters.task_deleted(instance)
 
 
 @receiver(post_save, sender=TaskAssignment)
+def update_membership_on_task_assignment_create(sender, instance, created, **kwargs):
+    """
+    Signal to update task counts in project memberships when a task assignment is created.
+    """
+    if created:
+        counters.assignments_changed(instance.task_id, [instance.user_id], 1)
+
+
 @receiver(post_delete, sender=TaskAssignment)
-def update_membership_on_task_assignment_change(sender, instance, **kwargs):
+def update_membership_on_task_assignment_delete(sender, instance, **kwargs):
     """
-    Signal to update task counts in project memberships when a task assignment is created or deleted.
+    Signal to update task counts in project memberships when a task assignment is deleted.
     """
-    project = instance.task.project
-    user = instance.user
+    counters.assignments_changed(instance.task_id, [instance.user_id], -1)
 
-    # Only update the membership if the task assignment or deletion affects task counts
-    membership = ProjectMembership.objects.filter(project=project, user=user).first()
-    if membership:
-        membership.update_task_counts()
 
+# ==================== #
+# Due date reminders   #
+# ==================== #
+# Upcoming due dates are kept in a Redis sorted set. See core/reminders.py.
 
 @receiver(post_save, sender=Task)
-def update_membership_on_task_status_change(sender, instance, **kwargs):
-    """
-    Signal to update completed task counts when a task's status changes to 'completed'.
-    """
-    if instance.status == 'completed':
-        project = instance.project
-
-        # Update completed tasks for all memberships associated with this task
-        for assignment in instance.assignments.all():
-            membership = ProjectMembership.objects.filter(
-                project=project, user=assignment.user
-            ).first()
-            if membership:
-                membership.update_task_counts()
\ No newline at end of file
+@receiver(post_save, sender=Project)
+def schedule_due_date_reminders(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not {'due_date', 'status'} & set(update_fields):
+        return
+    reminders.schedule(instance)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Project)
+def unschedule_due_date_reminders(sender, instance, **kwargs):
+    reminders.unschedule(instance)
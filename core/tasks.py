@@ -1,11 +1,18 @@
+from collections import Counter
 from celery import shared_task
-from project_planner.logging import INFO, project_logger
+from project_planner.logging import ERROR, INFO, project_logger
 from apps.projects.models import Project, ProjectMembership
 from apps.tasks.models import Task, TaskAssignment
-from apps.notifications.utils import send_real_time_notification
-from apps.notifications.models import Notification, NotificationPreference
-from django.core.mail import EmailMultiAlternatives
+from apps.notifications.utils import dispatch_outbox, push_digests, requeue_failed, send_bulk_notifications
+from apps.notifications.models import ArchivedNotification, Notification, NotificationPreference, ReminderMarker
+from apps.notifications.unread import unread_changed
+from apps.users import last_seen
+from core import counters, reminders
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
@@ -18,19 +25,20 @@ User = get_user_model()
 
 # Task to send emails
 @shared_task
-def send_email(subject, message, recipient, content_type="text/plain"):
+def send_email(subject, message, recipient, content_type="text/plain", text_message=''):
     """
     Task to send HTML emails using Django's EmailMultiAlternatives.
     Args:
         subject (str): Email subject.
         message (str): HTML content of the email.
         recipient (str): Recipient email address.
+        text_message (str): Plain-text alternative of the email.
     """
 
     # Create an EmailMultiAlternatives object
     email = EmailMultiAlternatives(
         subject=subject,
-        body='',  # Plain-text body
+        body=text_message,  # Plain-text body
         from_email=settings.DEFAULT_FROM_EMAIL,
         to=[recipient],
     )
@@ -38,103 +46,392 @@ def send_email(subject, message, recipient, content_type="text/plain"):
     # Send the email
     email.send()
 
-@shared_task
-def retry_failed_notifications(notification_id):
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_email_batch(self, messages, content_type="text/plain"):
     """
-    Retry sending a failed notification.
+    Send a chunk of emails over one backend connection.
+    Args:
+        messages (list): [subject, message, recipient] or [subject, message, recipient, text_message] lists.
+        content_type (str): Content type of the messages.
+    Messages that fail are retried as a smaller batch up to max_retries times, with
+    exponential backoff. Returns a report of the sent and failed recipients.
     """
+    sent, failed = [], []
+    connection = get_connection()
     try:
-        notification = Notification.objects.get(id=notification_id, status="failed" or "pending")
-        notification.resend_notification()
-    except Notification.DoesNotExist:
-        pass
-    
+        connection.open()
+        for item in messages:
+            subject, message, recipient = item[:3]
+            email = EmailMultiAlternatives(
+                subject=subject,
+                body=item[3] if len(item) > 3 else '',
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[recipient],
+                connection=connection,
+            )
+            email.attach_alternative(message, content_type)
+            try:
+                connection.send_messages([email])
+                sent.append(recipient)
+            except Exception as e:
+                failed.append((item, str(e)))
+    except Exception as e:
+        # The connection could not be opened, nothing was sent
+        raise self.retry(exc=e, countdown=self.default_retry_delay * 2 ** self.request.retries)
+    finally:
+        connection.close()
+
+    report = {'sent': len(sent), 'failed': [item[2] for item, _ in failed]}
+    if failed:
+        project_logger.log(ERROR, f"Email batch: {len(sent)} sent, {len(failed)} failed: {failed[0][1]}")
+        if self.request.retries < self.max_retries:
+            self.retry(
+                args=[[item for item, _ in failed], content_type],
+                countdown=self.default_retry_delay * 2 ** self.request.retries,
+            )
+    return report
+
 @shared_task
-def prune_notifications():
+def retry_failed_notifications():
+    """
+    Periodic sweep of failed and pending notifications without an outbox entry.
+    Due rows are queued for redelivery in batches of NOTIFICATION_RETRY_BATCH_SIZE,
+    rows that used up their attempts are dead-lettered.
+    """
+    total_requeued = total_dead = 0
+    while True:
+        requeued, dead = requeue_failed(settings.NOTIFICATION_RETRY_BATCH_SIZE)
+        total_requeued += requeued
+        total_dead += dead
+        if requeued < settings.NOTIFICATION_RETRY_BATCH_SIZE and dead < settings.NOTIFICATION_RETRY_BATCH_SIZE:
+            break
+    if total_requeued or total_dead:
+        project_logger.log(INFO, f"Retry sweep: {total_requeued} notifications requeued, {total_dead} dead-lettered")
+
+PRUNE_CHECKPOINT_KEY = 'notification_prune_checkpoint'
+PRUNE_RECIPIENT_BATCH = 500  # recipients per window query
+
+
+def _delete_notifications(rows, chunk_size):
     """
-    Keep only the latest 50 notifications per user and delete the rest.
+    Delete (id, recipient_id, is_read) rows in chunks and decrement the unread
+    counters of their recipients.
+    """
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        Notification.objects.filter(id__in=[pk for pk, _, _ in chunk]).delete()
+        unread_changed(
+            {recipient_id: -count for recipient_id, count in Counter(
+                recipient_id for _, recipient_id, is_read in chunk if not is_read
+            ).items()}
+        )
+
+
+@shared_task
+def prune_notifications(keep=None, chunk_size=None):
+    """
+    Keep only the latest NOTIFICATION_RETENTION_PER_USER notifications per user and delete the rest.
+    Recipients are processed in batches with one ROW_NUMBER() window query each, and the
+    stale rows are deleted NOTIFICATION_PRUNE_CHUNK_SIZE at a time. The last finished
+    recipient is checkpointed in the cache, so an interrupted run resumes where it stopped.
     Create a interval task on admin panel to run this task every 7 days.
     """
-    users = Notification.objects.values_list('user_id', flat=True).distinct()  # Get all unique user IDs
-    for user_id in users:
-        notifications = Notification.objects.filter(user_id=user_id).order_by('-created_at')
-        if notifications.count() > 50:  # Check if the user has more than 50 notifications
-            # Delete notifications older than the 50th most recent
-            notifications_to_delete = notifications[50:]
-            notifications_to_delete.delete()
-            
+    keep = keep or settings.NOTIFICATION_RETENTION_PER_USER
+    chunk_size = chunk_size or settings.NOTIFICATION_PRUNE_CHUNK_SIZE
+    checkpoint = cache.get(PRUNE_CHECKPOINT_KEY, 0)
+    deleted = 0
+
+    while True:
+        recipient_ids = list(
+            Notification.objects.filter(recipient_id__gt=checkpoint)
+            .order_by('recipient_id').values_list('recipient_id', flat=True)
+            .distinct()[:PRUNE_RECIPIENT_BATCH]
+        )
+        if not recipient_ids:
+            break
+
+        stale = list(
+            Notification.objects.filter(recipient_id__gte=recipient_ids[0], recipient_id__lte=recipient_ids[-1])
+            .annotate(position=Window(
+                RowNumber(),
+                partition_by=F('recipient_id'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ))
+            .filter(position__gt=keep)
+            .values_list('id', 'recipient_id', 'is_read')
+        )
+        _delete_notifications(stale, chunk_size)
+        deleted += len(stale)
+
+        checkpoint = recipient_ids[-1]
+        cache.set(PRUNE_CHECKPOINT_KEY, checkpoint, timeout=None)
+
+    cache.delete(PRUNE_CHECKPOINT_KEY)
+    project_logger.log(INFO, f"Pruned {deleted} notifications")
+
+
+@shared_task
+def trim_notifications(recipient_ids):
+    """
+    Trim the given recipients down to NOTIFICATION_RETENTION_PER_USER notifications.
+    Queued after inserts when NOTIFICATION_TRIM_ON_INSERT is enabled. Each lookup
+    skips at most that many entries of the (recipient, created_at, id) index.
+    """
+    keep = settings.NOTIFICATION_RETENTION_PER_USER
+    stale = []
+    for recipient_id in recipient_ids:
+        stale.extend(
+            Notification.objects.filter(recipient_id=recipient_id)
+            .order_by('-created_at', '-id').values_list('id', 'recipient_id', 'is_read')[keep:]
+        )
+    _delete_notifications(stale, settings.NOTIFICATION_PRUNE_CHUNK_SIZE)
+
+@shared_task
+def archive_notifications(chunk_size=None):
+    """
+    Move read notifications older than NOTIFICATION_ARCHIVE_AFTER_DAYS to the archive
+    table, NOTIFICATION_ARCHIVE_CHUNK_SIZE rows per transaction. Unread notifications
+    stay in the hot table so the unread counters and mark-read paths never touch the archive.
+    Copies keep their primary key and conflicts are ignored, so a retried chunk is harmless.
+    """
+    chunk_size = chunk_size or settings.NOTIFICATION_ARCHIVE_CHUNK_SIZE
+    cutoff = now() - timedelta(days=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS)
+    candidates = Notification.objects.filter(
+        created_at__lt=cutoff, is_read=True, outbox_entry__isnull=True
+    ).order_by('id')
+    archived = 0
+    last_id = 0
+
+    while True:
+        rows = list(candidates.filter(id__gt=last_id).values(*ArchivedNotification.COPIED_FIELDS)[:chunk_size])
+        if not rows:
+            break
+        with transaction.atomic():
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+            )
+            Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        archived += len(rows)
+        last_id = rows[-1]['id']
+
+    project_logger.log(INFO, f"Archived {archived} notifications older than {cutoff}")
+
+
+REMINDER_MODELS = (
+    # (model, detail url name, related name of the members to remind)
+    (Task, 'task-retrieve-update-destroy', 'assignments'),
+    (Project, 'project-retrieve-update-destroy', 'memberships'),
+)
+REMINDER_CHECKPOINT_KEY = 'due_reminder_checkpoint_{}'
+DUE_SOON_REMINDER = 'due_soon'
+
+
+@shared_task
+def process_due_reminders():
+    """
+    Pop the due entries of the reminder schedule (see core/reminders.py) and send
+    their due_soon reminders or mark their objects overdue. Runs every
+    REMINDER_POLL_INTERVAL seconds and only touches the popped objects.
+    """
+    current_time = now()
+    while True:
+        due = reminders.pop_due(settings.REMINDER_CHUNK_SIZE)
+        try:
+            for model, url_name, members in REMINDER_MODELS:
+                model_name = model._meta.model_name
+                if due.get(('due_soon', model_name)):
+                    _remind_chunk(
+                        list(_due_soon(model, members, current_time).filter(id__in=due[('due_soon', model_name)])),
+                        model, url_name, members
+                    )
+                if due.get(('overdue', model_name)):
+                    _overdue(model, current_time).filter(id__in=due[('overdue', model_name)]).update(status="overdue")
+        except Exception:
+            # Sent reminders have markers, so retrying the whole chunk sends nothing twice
+            reminders.restore(due)
+            raise
+        if sum(len(ids) for ids in due.values()) < settings.REMINDER_CHUNK_SIZE:
+            break
+
+
 @shared_task
 def check_overdue_items():
+    """
+    Daily reconciliation of the reminder schedule: remind assignees and members of
+    tasks and projects due within 24 hours that were not reminded yet, mark the
+    ones past their due date as overdue and re-add missing schedule entries.
+    """
     current_time = now()
-    base_url = settings.FRONTEND_URL
-
-    # Check tasks nearing overdue
-    tasks_to_notify = Task.objects.filter(
-        due_date__isnull = False,
-        due_date__lte=current_time + timedelta(hours=24),
-        status__in=["not_started", "in_progress"]
-    ).prefetch_related('assignments__user')
-    for task in tasks_to_notify:
-        task_members = task.assignments.all()
-        for assignment in task_members:
-            send_real_time_notification(
-                user=assignment.user,
-                message={
-                    "title": "Task Nearing Due Date",
-                    "body": f"The task '{task.name}' is nearing its due date.",
-                    "url": f"{base_url}{reverse('task-retrieve-update-destroy', kwargs={'pk': task.id})}"
-                },
-                notification_type="task",
-                content_type=ContentType.objects.get_for_model(Task).id,
-                object_id=task.id
-            )
+    for model, url_name, members in REMINDER_MODELS:
+        _send_due_reminders(model, url_name, members, current_time)
+        _mark_overdue(model, current_time)
+    reminders.rebuild([model for model, _, _ in REMINDER_MODELS])
+
+    # Markers of past due dates can no longer match a candidate
+    ReminderMarker.objects.filter(due_date__lt=current_time - timedelta(days=1)).delete()
+
+
+def _due_soon(model, members, current_time):
+    return model.objects.filter(
+        due_date__isnull=False,
+        due_date__lte=current_time + reminders.REMINDER_LEAD_TIME,
+        status__in=reminders.OPEN_STATUSES
+    ).only('id', 'name', 'due_date').prefetch_related(members)
 
-    # Mark overdue tasks
-    Task.objects.filter(
-        due_date__isnull = False,
+
+def _overdue(model, current_time):
+    return model.objects.filter(
+        due_date__isnull=False,
         due_date__lt=current_time,
-        status__in=["not_started", "in_progress"]
-    ).update(status="overdue")
-
-    # Check projects nearing overdue
-    projects_to_notify = Project.objects.filter(
-        due_date__isnull = False,
-        due_date__lte=current_time + timedelta(hours=24),
-        status__in=["not_started", "in_progress"]
-    ).prefetch_related('memberships__user')
-    
-    for project in projects_to_notify:
-        project_members = project.memberships.all()
-        for membership in project_members:
-            send_real_time_notification(
-                user=membership.user,
+        status__in=reminders.OPEN_STATUSES
+    )
+
+
+def _send_due_reminders(model, url_name, members, current_time):
+    """
+    Walk the objects due within 24 hours in id order and notify the members that
+    have no due_soon marker for the current due date yet. Each chunk commits its
+    notifications together with their markers and advances a checkpoint, so an
+    interrupted run resumes where it stopped and a repeated run sends nothing twice.
+    """
+    checkpoint_key = REMINDER_CHECKPOINT_KEY.format(model._meta.model_name)
+    candidates = _due_soon(model, members, current_time).filter(
+        id__gt=cache.get(checkpoint_key, 0)
+    ).order_by('id')
+
+    chunk = []
+    for obj in candidates.iterator(chunk_size=settings.REMINDER_CHUNK_SIZE):
+        chunk.append(obj)
+        if len(chunk) == settings.REMINDER_CHUNK_SIZE:
+            _remind_chunk(chunk, model, url_name, members)
+            cache.set(checkpoint_key, chunk[-1].id, timeout=None)
+            chunk = []
+    if chunk:
+        _remind_chunk(chunk, model, url_name, members)
+    cache.delete(checkpoint_key)
+
+
+def _remind_chunk(objects, model, url_name, members):
+    """
+    Send the due_soon reminders of the objects to the members without a marker for
+    the current due date, and record the markers in the same transaction.
+    """
+    if not objects:
+        return
+    content_type = ContentType.objects.get_for_model(model)
+    # reverse() once, with a placeholder for the primary key
+    url_template = settings.FRONTEND_URL + reverse(url_name, kwargs={'pk': 0}).replace('/0/', '/{}/')
+    sent = set(ReminderMarker.objects.filter(
+        content_type=content_type,
+        object_id__in=[obj.id for obj in objects],
+        kind=DUE_SOON_REMINDER,
+    ).values_list('object_id', 'recipient_id', 'due_date'))
+
+    markers = []
+    with transaction.atomic():
+        for obj in objects:
+            recipients = [
+                member.user_id for member in getattr(obj, members).all()
+                if (obj.id, member.user_id, obj.due_date) not in sent
+            ]
+            if not recipients:
+                continue
+            send_bulk_notifications(
+                recipients,
                 message={
-                    "title": "Project Nearing Due Date",
-                    "body": f"The project '{project.name}' is nearing its due date.",
-                    "url": f"{base_url}{reverse('project-retrieve-update-destroy', kwargs={'pk': project.id})}"
+                    "title": f"{content_type.model.capitalize()} Nearing Due Date",
+                    "body": f"The {content_type.model} '{obj.name}' is nearing its due date.",
+                    "url": url_template.format(obj.id)
                 },
-                notification_type="project",
-                content_type=ContentType.objects.get_for_model(Project).id,
-                object_id=project.id
+                notification_type=content_type.model,
+                content_type=content_type.id,
+                object_id=obj.id
             )
+            markers.extend(
+                ReminderMarker(
+                    content_type=content_type, object_id=obj.id, recipient_id=recipient_id,
+                    kind=DUE_SOON_REMINDER, due_date=obj.due_date
+                )
+                for recipient_id in recipients
+            )
+        # A marker left from an earlier due date is moved to the new one
+        ReminderMarker.objects.bulk_create(
+            markers,
+            update_conflicts=True,
+            unique_fields=['content_type', 'object_id', 'recipient', 'kind'],
+            update_fields=['due_date', 'sent_at'],
+        )
+
+
+def _mark_overdue(model, current_time):
+    """
+    Mark objects past their due date as overdue in batches of OVERDUE_UPDATE_BATCH_SIZE,
+    each in its own short transaction.
+    """
+    overdue = _overdue(model, current_time)
+    while True:
+        ids = list(overdue.order_by('id').values_list('id', flat=True)[:settings.OVERDUE_UPDATE_BATCH_SIZE])
+        if not ids:
+            break
+        overdue.filter(id__in=ids).update(status="overdue")
+        if len(ids) < settings.OVERDUE_UPDATE_BATCH_SIZE:
+            break
+
 
-    # Mark overdue projects
-    Project.objects.filter(
-        due_date__isnull = False,
-        due_date__lt=current_time,
-        status__in=["not_started", "in_progress"]
-    ).update(status="overdue")
-    
 @shared_task
 def update_last_seen():
-    updated_count = 0
-    for user in User.objects.all():
-        cache_key = f'user_last_seen_{user.id}'
-        last_seen = cache.get(cache_key)
-        if last_seen:
-            user.last_seen = last_seen
-            user.save(update_fields=['last_seen'])
-            cache.delete(cache_key)
-            updated_count += 1
-    
-    project_logger.log(INFO, f"Updated last_seen for {updated_count} users")
\ No newline at end of file
+    """
+    Write the last seen times buffered by LastSeenMiddleware for the users active
+    since the previous run, with one bulk_update per chunk.
+    """
+    updated_count = last_seen.flush()
+    project_logger.log(INFO, f"Updated last_seen for {updated_count} users")
+
+
+@shared_task
+def flush_dirty_counters():
+    """
+    Recompute the counters marked dirty while COUNTER_UPDATE_MODE is 'deferred'.
+    Scheduled every COUNTER_FLUSH_INTERVAL seconds.
+    """
+    if not counters.is_deferred():
+        return
+    corrected = counters.flush_dirty()
+    if any(corrected.values()):
+        project_logger.log(INFO, f"Flushed dirty counters: {corrected}")
+
+
+@shared_task
+def dispatch_notification_outbox():
+    """
+    Drain the notification outbox in batches of NOTIFICATION_OUTBOX_BATCH_SIZE.
+    Triggered after every commit that queues notifications and scheduled every
+    NOTIFICATION_OUTBOX_DISPATCH_INTERVAL seconds to pick up retries.
+    """
+    total_delivered = total_failed = 0
+    while True:
+        delivered, failed = dispatch_outbox(settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+        total_delivered += delivered
+        total_failed += failed
+        if delivered + failed < settings.NOTIFICATION_OUTBOX_BATCH_SIZE:
+            break
+    if total_delivered or total_failed:
+        project_logger.log(INFO, f"Dispatched notifications: {total_delivered} delivered, {total_failed} failed")
+
+
+DIGEST_CHECKPOINT_KEY = 'notification_digest_last_run'
+
+
+@shared_task
+def send_notification_digests():
+    """
+    Push a digest of the coalesced notifications updated since the previous run.
+    Scheduled every NOTIFICATION_DIGEST_INTERVAL seconds when the interval is set.
+    """
+    current_time = now()
+    since = cache.get(DIGEST_CHECKPOINT_KEY) or current_time - timedelta(seconds=settings.NOTIFICATION_DIGEST_INTERVAL)
+    sent = push_digests(since)
+    cache.set(DIGEST_CHECKPOINT_KEY, current_time, timeout=None)
+    if sent:
+        project_logger.log(INFO, f"Pushed notification digests to {sent} users")
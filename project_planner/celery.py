@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 from django.conf import settings
 from celery.schedules import crontab
 
@@ -17,22 +18,67 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS + ['core.tasks'])
 
 app.conf.beat_schedule = {
-    'check_due_dates_every_hour': {
+    'process-due-reminders': {
+        'task': 'core.tasks.process_due_reminders',
+        'schedule': settings.REMINDER_POLL_INTERVAL,  # Seconds, pops due entries of the reminder schedule
+    },
+    'check-due-dates-daily': {
         'task': 'core.tasks.check_overdue_items',
-        'schedule': crontab(minute=0, hour='*'),
+        'schedule': crontab(minute=0, hour=2),  # Reconciles the reminder schedule every day at 02:00
     },
     'prune-notifications-every-7-days': {
         'task': 'core.tasks.prune_notifications',
         'schedule': crontab(minute=0, hour=0, day_of_week=0),  # This will run every Sunday at midnight
     },
+    'archive-notifications-daily': {
+        'task': 'core.tasks.archive_notifications',
+        'schedule': crontab(minute=30, hour=3),  # Every day at 03:30
+    },
     'update-last-seen': {
         'task': 'core.tasks.update_last_seen',
         'schedule': crontab(minute='*/15'),  # Run every 15 minutes
     },
+    'flush-dirty-counters': {
+        'task': 'core.tasks.flush_dirty_counters',
+        'schedule': settings.COUNTER_FLUSH_INTERVAL,  # Seconds, only does work in deferred counter mode
+    },
+    'dispatch-notification-outbox': {
+        'task': 'core.tasks.dispatch_notification_outbox',
+        'schedule': settings.NOTIFICATION_OUTBOX_DISPATCH_INTERVAL,  # Seconds, picks up retries and missed wake-ups
+    },
+    'retry-failed-notifications': {
+        'task': 'core.tasks.retry_failed_notifications',
+        'schedule': settings.NOTIFICATION_RETRY_SWEEP_INTERVAL,  # Seconds
+    },
 }
+if settings.NOTIFICATION_DIGEST_INTERVAL:
+    app.conf.beat_schedule['send-notification-digests'] = {
+        'task': 'core.tasks.send_notification_digests',
+        'schedule': settings.NOTIFICATION_DIGEST_INTERVAL,
+    }
+
+@celeryd_init.connect
+def apply_worker_queue_options(sender=None, conf=None, options=None, **kwargs):
+    """
+    Set the concurrency and prefetch of a worker from WORKER_QUEUE_OPTIONS of the
+    queues it consumes. Values given on the command line take precedence.
+    """
+    queues = options.get('queues') or [queue.name for queue in settings.CELERY_TASK_QUEUES]
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    queue_options = [settings.WORKER_QUEUE_OPTIONS[queue] for queue in queues if queue in settings.WORKER_QUEUE_OPTIONS]
+    if not queue_options:
+        return
+    conf.worker_concurrency = sum(option['concurrency'] for option in queue_options)
+    conf.worker_prefetch_multiplier = min(option['prefetch_multiplier'] for option in queue_options)
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
 
 # To run the worker, use the following command:
-# celery -A project_planner worker --loglevel=info
\ No newline at end of file
+# celery -A project_planner worker --loglevel=info
+# or one worker per queue, so maintenance jobs never delay OTP mail:
+# celery -A project_planner worker -Q interactive -n interactive@%h --loglevel=info
+# celery -A project_planner worker -Q fanout -n fanout@%h --loglevel=info
+# celery -A project_planner worker -Q maintenance -n maintenance@%h --loglevel=info
\ No newline at end of file
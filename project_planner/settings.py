@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 from re import S
 from dotenv import load_dotenv
+from kombu import Queue
 
 # Load environment variables
 load_dotenv()
@@ -181,7 +182,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated', 
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.MiddlewareJWTAuthentication',  # Reuses LastSeenMiddleware's authentication
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -240,6 +241,8 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT'))
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
+# Recipients per send_email_batch task, each batch reuses one SMTP connection
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
 
 # Celery Configuration
 # ==================
@@ -251,6 +254,107 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Dhaka'
 CELERY_TASK_RESULT_EXPIRES = 3600
+# Queues: 'interactive' for latency sensitive mail (OTP, password reset),
+# 'fanout' for notification, reminder and bulk mail delivery, 'maintenance' for periodic
+# jobs and anything not routed. Workers started without -Q consume all of them,
+# `celery -A project_planner worker -Q interactive` consumes a subset.
+CELERY_TASK_QUEUES = [
+    Queue('interactive'),
+    Queue('fanout'),
+    Queue('maintenance'),
+]
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_ROUTES = {
+    'core.tasks.send_email': {'queue': 'interactive'},
+    'core.tasks.send_email_batch': {'queue': 'fanout'},
+    'core.tasks.dispatch_notification_outbox': {'queue': 'fanout'},
+    'core.tasks.trim_notifications': {'queue': 'fanout'},
+    'core.tasks.send_notification_digests': {'queue': 'fanout'},
+    'core.tasks.process_due_reminders': {'queue': 'fanout'},
+    'core.tasks.retry_failed_notifications': {'queue': 'fanout'},
+}
+# Concurrency and prefetch of a worker per consumed queue, applied in
+# project_planner/celery.py unless given on the command line. A worker consuming
+# several queues adds up their concurrency and uses the smallest prefetch.
+WORKER_QUEUE_OPTIONS = {
+    'interactive': {
+        'concurrency': int(os.getenv('CELERY_INTERACTIVE_CONCURRENCY', 4)),
+        'prefetch_multiplier': int(os.getenv('CELERY_INTERACTIVE_PREFETCH', 1)),
+    },
+    'fanout': {
+        'concurrency': int(os.getenv('CELERY_FANOUT_CONCURRENCY', 4)),
+        'prefetch_multiplier': int(os.getenv('CELERY_FANOUT_PREFETCH', 4)),
+    },
+    'maintenance': {
+        'concurrency': int(os.getenv('CELERY_MAINTENANCE_CONCURRENCY', 2)),
+        'prefetch_multiplier': int(os.getenv('CELERY_MAINTENANCE_PREFETCH', 1)),
+    },
+}
+
+# Counter Configuration
+# ===================
+# 'immediate' applies F() deltas to denormalized counters inside the request.
+# 'deferred' only marks the affected rows dirty in Redis and recomputes them
+# every COUNTER_FLUSH_INTERVAL seconds (reads become eventually consistent).
+COUNTER_UPDATE_MODE = os.getenv('COUNTER_UPDATE_MODE', 'immediate')
+COUNTER_FLUSH_INTERVAL = int(os.getenv('COUNTER_FLUSH_INTERVAL', 30))
+
+# Notification Outbox Configuration
+# =================================
+# Notifications are written to an outbox in the request transaction and pushed to
+# the channel layer by core.tasks.dispatch_notification_outbox or by the
+# dispatch_notifications management command.
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATION_OUTBOX_BATCH_SIZE', 1000))
+NOTIFICATION_OUTBOX_DISPATCH_INTERVAL = int(os.getenv('NOTIFICATION_OUTBOX_DISPATCH_INTERVAL', 10))
+# Failed or pending notifications that lost their outbox entry are requeued by
+# core.tasks.retry_failed_notifications with exponential backoff.
+NOTIFICATION_RETRY_BATCH_SIZE = int(os.getenv('NOTIFICATION_RETRY_BATCH_SIZE', 1000))
+NOTIFICATION_RETRY_SWEEP_INTERVAL = int(os.getenv('NOTIFICATION_RETRY_SWEEP_INTERVAL', 60))
+
+# Notification Retention Configuration
+# ====================================
+# prune_notifications keeps the latest NOTIFICATION_RETENTION_PER_USER notifications
+# per user and deletes the rest NOTIFICATION_PRUNE_CHUNK_SIZE rows at a time. With
+# NOTIFICATION_TRIM_ON_INSERT recipients are also trimmed right after new notifications.
+NOTIFICATION_RETENTION_PER_USER = int(os.getenv('NOTIFICATION_RETENTION_PER_USER', 50))
+NOTIFICATION_PRUNE_CHUNK_SIZE = int(os.getenv('NOTIFICATION_PRUNE_CHUNK_SIZE', 5000))
+NOTIFICATION_TRIM_ON_INSERT = os.getenv('NOTIFICATION_TRIM_ON_INSERT', 'False') == 'True'
+# Read notifications older than NOTIFICATION_ARCHIVE_AFTER_DAYS are moved to the
+# archive table daily. NotificationListView reads it for older created_at ranges.
+NOTIFICATION_ARCHIVE_AFTER_DAYS = int(os.getenv('NOTIFICATION_ARCHIVE_AFTER_DAYS', 7))
+NOTIFICATION_ARCHIVE_CHUNK_SIZE = int(os.getenv('NOTIFICATION_ARCHIVE_CHUNK_SIZE', 5000))
+# Announcements sent to all users stop being listed after NOTIFICATION_ANNOUNCEMENT_TTL_DAYS
+# unless the sender sets their own expiry (0 keeps them listed).
+NOTIFICATION_ANNOUNCEMENT_TTL_DAYS = int(os.getenv('NOTIFICATION_ANNOUNCEMENT_TTL_DAYS', 30))
+
+# Notification Coalescing Configuration
+# =====================================
+# Repeated events on the same object within NOTIFICATION_COALESCE_WINDOW seconds update
+# the recipient's unread notification instead of creating a new one (0 disables it).
+# With NOTIFICATION_DIGEST_INTERVAL set, coalesced updates are also pushed as a digest.
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv('NOTIFICATION_COALESCE_WINDOW', 300))
+NOTIFICATION_DIGEST_INTERVAL = int(os.getenv('NOTIFICATION_DIGEST_INTERVAL', 0))
+
+# WebSocket Heartbeat Configuration
+# =================================
+# One heartbeat loop per process pings every notification socket each
+# NOTIFICATION_WS_PING_INTERVAL seconds. Sockets without a client frame for
+# NOTIFICATION_WS_IDLE_TIMEOUT seconds are closed (0 keeps them open).
+NOTIFICATION_WS_PING_INTERVAL = int(os.getenv('NOTIFICATION_WS_PING_INTERVAL', 30))
+NOTIFICATION_WS_IDLE_TIMEOUT = int(os.getenv('NOTIFICATION_WS_IDLE_TIMEOUT', 0))
+# Number of recent notifications kept per user in Redis for replay on reconnect
+NOTIFICATION_REPLAY_STREAM_LENGTH = int(os.getenv('NOTIFICATION_REPLAY_STREAM_LENGTH', 100))
+
+# Due Date Reminder Configuration
+# ===============================
+# Upcoming due dates are kept in a Redis sorted set and popped by
+# core.tasks.process_due_reminders every REMINDER_POLL_INTERVAL seconds.
+# core.tasks.check_overdue_items reconciles daily, walking tasks and projects in
+# chunks of REMINDER_CHUNK_SIZE and marking overdue ones in batches of
+# OVERDUE_UPDATE_BATCH_SIZE.
+REMINDER_POLL_INTERVAL = int(os.getenv('REMINDER_POLL_INTERVAL', 30))
+REMINDER_CHUNK_SIZE = int(os.getenv('REMINDER_CHUNK_SIZE', 500))
+OVERDUE_UPDATE_BATCH_SIZE = int(os.getenv('OVERDUE_UPDATE_BATCH_SIZE', 1000))
 
 # Stripe Configuration
 # ====================